@@ -0,0 +1,98 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import time
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import Game
+
+ACTIVE_GAME_STATUSES = ("lobby", "playing")
+
+
+@dataclass(frozen=True)
+class ActiveGame:
+    id: UUID
+    title: str | None
+    status: str
+    owner_id: UUID | None
+    created_at: datetime
+    starts_at: datetime | None
+    ends_at: datetime | None
+    expires_at: datetime
+
+
+# "No active game" is cached too, so lobby screens between games stay cheap.
+# An invalidation while a load is in flight marks it stale, and its result is
+# not cached: it may have been read before the change.
+_CACHE: dict[str, object] = {"game": None, "cached_until": 0.0, "loading": False, "stale_load": False}
+_LOCK = asyncio.Lock()
+
+
+def invalidate_active_game() -> None:
+    _CACHE["game"] = None
+    _CACHE["cached_until"] = 0.0
+    if _CACHE["loading"]:
+        _CACHE["stale_load"] = True
+
+
+def _cached() -> tuple[bool, ActiveGame | None]:
+    if time.monotonic() >= float(_CACHE["cached_until"]):
+        return False, None
+    game = _CACHE["game"]
+    if game is not None and game.expires_at <= datetime.now(timezone.utc):
+        return False, None
+    return True, game
+
+
+async def resolve_active_game(db: AsyncSession) -> ActiveGame | None:
+    hit, game = _cached()
+    if hit:
+        return game
+
+    async with _LOCK:
+        # A concurrent caller may have refilled the cache while we waited.
+        hit, game = _cached()
+        if hit:
+            return game
+
+        stmt = (
+            select(Game)
+            .where(Game.status.in_(ACTIVE_GAME_STATUSES))
+            .where(Game.expires_at > func.now())
+            .order_by(Game.created_at.desc())
+            .limit(1)
+        )
+        _CACHE["loading"] = True
+        try:
+            result = await db.execute(stmt)
+        finally:
+            _CACHE["loading"] = False
+        row = result.scalar_one_or_none()
+        game = None
+        if row is not None:
+            game = ActiveGame(
+                id=row.id,
+                title=row.title,
+                status=row.status,
+                owner_id=row.owner_id,
+                created_at=row.created_at,
+                starts_at=row.starts_at,
+                ends_at=row.ends_at,
+                expires_at=row.expires_at,
+            )
+
+        if _CACHE["stale_load"]:
+            _CACHE["stale_load"] = False
+        else:
+            _CACHE["game"] = game
+            _CACHE["cached_until"] = time.monotonic() + get_settings().active_game_cache_ttl_seconds
+        return game
+
+
+async def resolve_active_game_id(db: AsyncSession) -> UUID | None:
+    game = await resolve_active_game(db)
+    return game.id if game else None
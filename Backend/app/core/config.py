@@ -7,6 +7,11 @@ class Settings(BaseSettings):
 
     # Database(Supabase)
     database_url: str
+    # Session-mode connection for LISTEN/NOTIFY when database_url points at a transaction-mode pooler
+    database_direct_url: str | None = None
+    # Optional streaming replica for polling reads (leaderboards, results, capture feeds)
+    database_replica_url: str | None = None
+    db_read_your_writes_seconds: float = 5.0  # after a write, that user's reads stay on the primary
     supabase_url: str | None = None
     supabase_anon_key: str | None = None
     supabase_jwt_secret: str | None = None
@@ -26,6 +31,54 @@ class Settings(BaseSettings):
     # NAVER MAP API (optional; frontend-only usage)
     naver_map_client_id: str | None = None
 
+    # SQLAlchemy pool, per worker process. Budget: workers * (pool_size + max_overflow) + workers
+    # (realtime LISTEN connections) must stay under the server's / pooler's connection limit.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 300  # seconds; keep below the server/pooler idle timeout
+    # true = extra SELECT 1 per checkout; false = invalidate on disconnect errors
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100  # asyncpg prepared statement cache per connection
+    # PgBouncer/Supavisor transaction mode: no server-side prepared statement reuse across transactions
+    db_pgbouncer: bool = False
+
+    # Shared outbound HTTP client (Supabase auth, JWKS, map validation)
+    http_timeout: float = 10.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_http2: bool = False
+
+    # Active game resolver cache (seconds)
+    active_game_cache_ttl_seconds: float = 5.0
+
+    # QR resolution: in-memory index of the active game's eyeballs, kept current by
+    # NOTIFY; the TTL only bounds staleness when the realtime listener is off.
+    qr_index_ttl_seconds: float = 300.0
+    qr_negative_cache_ttl_seconds: float = 30.0
+
+    # Eyeball type catalog, refreshed by NOTIFY on edits
+    eyeball_types_cache_ttl_seconds: float = 300.0
+
+    # Google OAuth PKCE state: "memory" (single worker) or "postgres" (shared by all workers)
+    oauth_state_backend: str = "memory"
+    oauth_state_ttl_seconds: float = 600.0
+    oauth_state_max_entries: int = 10000
+
+    # Realtime leaderboard push (Postgres LISTEN/NOTIFY + SSE)
+    realtime_enabled: bool = True
+    realtime_heartbeat_seconds: float = 15.0
+
+    # /metrics (Prometheus text format); when set, scrapers must send "Authorization: Bearer <token>"
+    metrics_token: str | None = None
+
+    # SQL statement accounting per request
+    db_debug_headers: bool = False  # adds Server-Timing / X-DB-Statements to responses
+    db_query_budget_strict: bool = False  # raise instead of log when a route exceeds query_budget()
+    # same statement this many times in one request => N+1 warning
+    db_repeated_statement_threshold: int = 5
+
 
 @lru_cache
 def get_settings() -> Settings:
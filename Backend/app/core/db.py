@@ -1,15 +1,147 @@
-from collections.abc import AsyncGenerator
+import asyncio
+from collections.abc import AsyncGenerator, Awaitable, Callable
+import time
+from typing import Any
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.metrics import MeteredQueuePool, instrument_engine
+from app.core.security import CurrentUser, get_current_user
 
 settings = get_settings()
 
-engine = create_async_engine(settings.database_url, pool_pre_ping=True)
+
+def _connect_args(settings: Settings) -> dict:
+    if settings.db_pgbouncer:
+        # Transaction-mode poolers hand each transaction to any server connection, so
+        # named prepared statements must be unique and never cached client-side.
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"statement_cache_size": settings.db_statement_cache_size}
+
+
+def create_engine(url: str, settings: Settings) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        poolclass=MeteredQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(settings),
+    )
+    instrument_engine(engine)
+    return engine
+
+
+engine = create_engine(settings.database_url, settings)
 AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False)
 
+# Without DATABASE_REPLICA_URL the read dependencies fall back to the primary.
+replica_engine = (
+    create_engine(settings.database_replica_url, settings) if settings.database_replica_url else engine
+)
+ReadSessionLocal = async_sessionmaker(bind=replica_engine, expire_on_commit=False)
+
+# Users who just wrote read from the primary until the replica has had time to
+# catch up. The pin is kept in two places. _PRIMARY_PINS maps user_id to a
+# monotonic deadline, but only within this worker. The write response also carries
+# the wall-clock deadline in READ_YOUR_WRITES_HEADER, and clients echo it back so
+# the pin holds on whichever worker serves their next read.
+_PRIMARY_PINS: dict[str, float] = {}
+_PRIMARY_PINS_MAX = 10000
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+
+def pin_primary(user_id: str, response: Response) -> None:
+    if replica_engine is engine:
+        return
+    now = time.monotonic()
+    if len(_PRIMARY_PINS) >= _PRIMARY_PINS_MAX:
+        for pinned_user, pinned_until in list(_PRIMARY_PINS.items()):
+            if pinned_until <= now:
+                del _PRIMARY_PINS[pinned_user]
+    _PRIMARY_PINS[user_id] = now + settings.db_read_your_writes_seconds
+    pinned_until = time.time() + settings.db_read_your_writes_seconds
+    response.headers[READ_YOUR_WRITES_HEADER] = f"{pinned_until:.3f}"
+
+
+def _is_pinned(user_id: str) -> bool:
+    pinned_until = _PRIMARY_PINS.get(user_id)
+    if pinned_until is None:
+        return False
+    if pinned_until <= time.monotonic():
+        _PRIMARY_PINS.pop(user_id, None)
+        return False
+    return True
+
 
+def _is_client_pinned(request: Request) -> bool:
+    try:
+        pinned_until = float(request.headers.get(READ_YOUR_WRITES_HEADER, ""))
+    except ValueError:
+        return False
+    now = time.time()
+    # A deadline further out than any real pin is forged; ignore it.
+    return now < pinned_until <= now + settings.db_read_your_writes_seconds
+
+
+# Primary session; use for writes and for reads that must see them immediately.
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# Replica session for polling reads, pinned to the primary right after the user's own writes.
+async def get_read_db(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+) -> AsyncGenerator[AsyncSession, None]:
+    pinned = _is_pinned(current_user.user_id) or _is_client_pinned(request)
+    session_factory = AsyncSessionLocal if pinned else ReadSessionLocal
+    async with session_factory() as session:
+        yield session
+
+
+def _spare_connections(engine: AsyncEngine) -> int:
+    pool = engine.sync_engine.pool
+    # overflow() is negative until pool_size connections have been opened.
+    return pool.checkedin() + settings.db_max_overflow - pool.overflow()
+
+
+# Runs independent reads at the same time: the first on the caller's session, the
+# rest on their own sessions from the same engine (so replica routing and pinning
+# carry over). Each extra read holds another pooled connection for its duration,
+# so when the pool cannot spare them the reads run one after another on the
+# caller's session instead of queueing behind other requests.
+async def run_concurrently(
+    db: AsyncSession,
+    *reads: Callable[[AsyncSession], Awaitable[Any]],
+) -> list[Any]:
+    first, *rest = reads
+    engine = db.bind
+    if settings.db_max_overflow >= 0 and len(rest) > _spare_connections(engine):
+        return [await read(db) for read in reads]
+
+    async def on_own_session(read: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        async with AsyncSession(bind=engine, expire_on_commit=False) as session:
+            return await read(session)
+
+    results = await asyncio.gather(
+        first(db),
+        *(on_own_session(read) for read in rest),
+        return_exceptions=True,
+    )
+    # Raise only once every read is done: the first may still be running on the
+    # caller's session, which is rolled back as the error unwinds the request.
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
@@ -0,0 +1,144 @@
+import asyncio
+from contextlib import asynccontextmanager
+import json
+import logging
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from app.core.active_game import invalidate_active_game
+from app.core.config import get_settings
+from app.core.eyeball_types import invalidate_eyeball_types
+from app.core.qr_index import invalidate_qr_index, set_eyeball_active
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel written by the triggers in db/schema.sql. Every worker keeps
+# one LISTEN connection and fans notifications out to its own subscribers, so
+# connected players cost no queries per update.
+GAME_EVENTS_CHANNEL = "game_events"
+_RECONNECT_DELAY_SECONDS = 5.0
+
+_listener_task: asyncio.Task | None = None
+_subscriptions: dict[str, set["LeaderboardSubscription"]] = {}
+
+
+# Deltas are coalesced per group, so a slow client holds at most one pending row per group.
+class LeaderboardSubscription:
+    def __init__(self) -> None:
+        self._pending: dict[str, dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, delta: dict) -> None:
+        self._pending[delta["group_id"]] = delta
+        self._ready.set()
+
+    async def next_batch(self, timeout: float) -> list[dict]:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch = list(self._pending.values())
+        self._pending.clear()
+        return batch
+
+
+@asynccontextmanager
+async def subscribe_leaderboard(game_id: str):
+    subscription = LeaderboardSubscription()
+    _subscriptions.setdefault(str(game_id), set()).add(subscription)
+    try:
+        yield subscription
+    finally:
+        subscribers = _subscriptions.get(str(game_id))
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                _subscriptions.pop(str(game_id), None)
+
+
+def _dispatch(raw_payload: str) -> None:
+    try:
+        event = json.loads(raw_payload)
+    except ValueError:
+        logger.warning("Ignoring malformed %s payload: %s", GAME_EVENTS_CHANNEL, raw_payload)
+        return
+
+    event_type = event.get("type")
+    if event_type == "leaderboard":
+        delta = event.get("data") or {}
+        for subscription in _subscriptions.get(str(event.get("game_id")), ()):
+            subscription.push(delta)
+    elif event_type == "game":
+        invalidate_active_game()
+        invalidate_qr_index(event.get("game_id"))
+    elif event_type == "eyeball":
+        data = event.get("data") or {}
+        set_eyeball_active(event.get("game_id"), data.get("id"), bool(data.get("is_active")))
+    elif event_type == "eyeballs":
+        invalidate_qr_index(event.get("game_id"))
+    elif event_type == "eyeball_types":
+        invalidate_eyeball_types()
+
+
+def _on_notification(connection, pid, channel, payload) -> None:
+    _dispatch(payload)
+
+
+def _listener_dsn() -> str:
+    # LISTEN needs a session-mode connection; a transaction-mode pooler would drop it.
+    settings = get_settings()
+    url = make_url(settings.database_direct_url or settings.database_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def _listen_forever() -> None:
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(_listener_dsn())
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            await connection.add_listener(GAME_EVENTS_CHANNEL, _on_notification)
+            # Notifications sent while we were disconnected are lost; drop caches they
+            # would have invalidated.
+            invalidate_active_game()
+            invalidate_qr_index()
+            invalidate_eyeball_types()
+            logger.info("Listening on Postgres channel %s", GAME_EVENTS_CHANNEL)
+            await closed.wait()
+            logger.warning("Postgres listener connection closed; reconnecting")
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # noqa: BLE001 - keep retrying; realtime updates are best effort
+            logger.exception("Postgres listener failed; retrying in %.0fs", _RECONNECT_DELAY_SECONDS)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(_RECONNECT_DELAY_SECONDS)
+
+
+async def start_event_listener() -> None:
+    global _listener_task
+    settings = get_settings()
+    if not settings.realtime_enabled:
+        return
+    if settings.db_pgbouncer and not settings.database_direct_url:
+        logger.warning(
+            "DB_PGBOUNCER is set without DATABASE_DIRECT_URL; LISTEN through the pooler may miss events"
+        )
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_forever())
+
+
+async def stop_event_listener() -> None:
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except asyncio.CancelledError:
+        pass
+    _listener_task = None
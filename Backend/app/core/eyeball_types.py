@@ -0,0 +1,98 @@
+import asyncio
+from collections.abc import Iterable
+from dataclasses import dataclass
+import time
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models import EyeballType
+
+
+@dataclass(frozen=True)
+class EyeballTypeInfo:
+    id: UUID
+    name: str
+    event_type: str | None
+    payload: dict[str, Any]
+
+
+# The whole eyeball_types table, so read queries can skip the join and fill in
+# type fields here. Edits reach every worker as 'eyeball_types' events
+# (app/core/events.py); the TTL only matters when the listener is off. An edit
+# announced while a load is in flight marks it stale, so its result is not cached.
+_CACHE: dict[str, object] = {"types": None, "cached_until": 0.0, "loading": False, "stale_load": False}
+_LOCK = asyncio.Lock()
+
+
+def invalidate_eyeball_types() -> None:
+    _CACHE["types"] = None
+    _CACHE["cached_until"] = 0.0
+    if _CACHE["loading"]:
+        _CACHE["stale_load"] = True
+
+
+def _cached(type_ids: Iterable[UUID]) -> dict[UUID, EyeballTypeInfo] | None:
+    types = _CACHE["types"]
+    if types is None or time.monotonic() >= float(_CACHE["cached_until"]):
+        return None
+    # A type created moments ago may not have been announced yet.
+    if any(type_id not in types for type_id in type_ids):
+        return None
+    return types
+
+
+async def get_eyeball_types(
+    db: AsyncSession,
+    type_ids: Iterable[UUID] = (),
+) -> dict[UUID, EyeballTypeInfo]:
+    type_ids = set(type_ids)
+    types = _cached(type_ids)
+    if types is not None:
+        return types
+
+    async with _LOCK:
+        types = _cached(type_ids)
+        if types is not None:
+            return types
+
+        _CACHE["loading"] = True
+        try:
+            result = await db.execute(select(EyeballType))
+        finally:
+            _CACHE["loading"] = False
+        types = {
+            row.id: EyeballTypeInfo(
+                id=row.id,
+                name=row.name,
+                event_type=row.event_type,
+                payload=row.payload,
+            )
+            for row in result.scalars().all()
+        }
+        if _CACHE["stale_load"]:
+            _CACHE["stale_load"] = False
+        else:
+            _CACHE["types"] = types
+            _CACHE["cached_until"] = time.monotonic() + get_settings().eyeball_types_cache_ttl_seconds
+        return types
+
+
+async def eyeball_type_names(db: AsyncSession, type_ids: Iterable[UUID]) -> dict[UUID, str]:
+    type_ids = set(type_ids)
+    types = await get_eyeball_types(db, type_ids)
+    return {type_id: types[type_id].name for type_id in type_ids if type_id in types}
+
+
+def count_by_type_name(
+    types: dict[UUID, EyeballTypeInfo],
+    counts: Iterable[tuple[UUID, int]],
+) -> dict[str, int]:
+    # Every type is listed, including those with no active eyeballs.
+    by_name = {type_info.name: 0 for type_info in types.values()}
+    for type_id, count in counts:
+        by_name[types[type_id].name] += count
+    return by_name
@@ -0,0 +1,52 @@
+import logging
+
+import httpx
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    settings = get_settings()
+    http2 = settings.http_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP_HTTP2 is enabled but the h2 package is missing; using HTTP/1.1")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    return httpx.AsyncClient(
+        timeout=settings.http_timeout,
+        limits=limits,
+        http2=http2,
+    )
+
+
+async def start_http_client() -> None:
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # Lazily build the client for callers running outside the app lifespan (scripts, shells).
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
@@ -0,0 +1,360 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import logging
+import math
+import time
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition without the client library. Everything lives in
+# process memory; with several workers each one reports its own series.
+
+UNMATCHED_ROUTE = "<unmatched>"
+BACKGROUND_ROUTE = "<background>"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, labels: tuple, amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0.0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for labels, series in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(
+                    f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {_number(count)}"
+                )
+            lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {_number(series[-2])}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {_number(series[-2])}")
+        return lines
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until response start.", ("method", "route")
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route")
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request.",
+    ("method", "route"),
+    STATEMENT_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", ("method", "route")
+)
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed.", ("route",))
+DB_STATEMENT_TIME = Counter("db_statement_seconds_total", "Time spent executing SQL.", ("route",))
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (includes opening new ones).",
+    ("route",),
+)
+POOL_HOLD = Histogram(
+    "db_pool_connection_hold_seconds", "Time a pooled connection stayed checked out.", ("route",)
+)
+POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts_total", "Pool checkouts that timed out.", ("route",))
+BUDGET_EXCEEDED = Counter(
+    "db_query_budget_exceeded_total",
+    "Requests that ran more SQL statements than their route budget.",
+    ("method", "route"),
+)
+REPEATED_STATEMENTS = Counter(
+    "db_repeated_statements_total",
+    "Requests that repeated one SQL statement (likely N+1).",
+    ("method", "route"),
+)
+
+_COLLECTORS = (
+    REQUESTS,
+    REQUEST_DURATION,
+    IN_FLIGHT,
+    REQUEST_STATEMENTS,
+    REQUEST_DB_TIME,
+    DB_STATEMENTS,
+    DB_STATEMENT_TIME,
+    POOL_CHECKOUT_WAIT,
+    POOL_HOLD,
+    POOL_TIMEOUTS,
+    BUDGET_EXCEEDED,
+    REPEATED_STATEMENTS,
+)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class RequestStats:
+    method: str
+    route: str
+    status_code: int = 500
+    statements: int = 0
+    db_seconds: float = 0.0
+    in_flight: bool = False
+    statement_budget: int | None = None
+    statement_counts: dict[str, int] = field(default_factory=dict)
+
+
+_REQUEST_STATS: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+_IN_CHECKOUT: ContextVar[bool] = ContextVar("in_pool_checkout", default=False)
+_STRICT_BUDGET: ContextVar[bool] = ContextVar("strict_query_budget", default=False)
+_BUDGET_OVERRIDE: ContextVar[int | None] = ContextVar("query_budget_override", default=None)
+
+
+def _current_route() -> str:
+    stats = _REQUEST_STATS.get()
+    return stats.route if stats else BACKGROUND_ROUTE
+
+
+@contextmanager
+def track_request(method: str):
+    stats = RequestStats(method=method, route=UNMATCHED_ROUTE, statement_budget=_BUDGET_OVERRIDE.get())
+    token = _REQUEST_STATS.set(stats)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        duration = time.perf_counter() - start
+        labels = (method, stats.route)
+        if stats.in_flight:
+            IN_FLIGHT.dec(labels)
+        _REQUEST_STATS.reset(token)
+        REQUESTS.inc((method, stats.route, str(stats.status_code)))
+        REQUEST_DURATION.observe(labels, duration)
+        REQUEST_STATEMENTS.observe(labels, stats.statements)
+        REQUEST_DB_TIME.observe(labels, stats.db_seconds)
+        _report_statement_usage(stats)
+
+
+def _report_statement_usage(stats: RequestStats) -> None:
+    labels = (stats.method, stats.route)
+    if stats.statement_budget is not None and stats.statements > stats.statement_budget:
+        BUDGET_EXCEEDED.inc(labels)
+        logger.warning(
+            "Query budget exceeded on %s %s: %d statements (budget %d)",
+            stats.method,
+            stats.route,
+            stats.statements,
+            stats.statement_budget,
+        )
+
+    threshold = get_settings().db_repeated_statement_threshold
+    repeated = [
+        (count, statement) for statement, count in stats.statement_counts.items() if count >= threshold
+    ]
+    if repeated:
+        REPEATED_STATEMENTS.inc(labels)
+        for count, statement in repeated:
+            logger.warning(
+                "Possible N+1 on %s %s: statement ran %d times: %s",
+                stats.method,
+                stats.route,
+                count,
+                " ".join(statement.split())[:200],
+            )
+
+
+# Route-level budget, e.g. @router.post("", dependencies=[query_budget(2)]).
+# Exceeding it is logged and counted; with DB_QUERY_BUDGET_STRICT or inside
+# enforce_query_budget() the statement that crosses the budget raises
+# QueryBudgetExceeded instead.
+def query_budget(max_statements: int):
+    async def _apply_query_budget() -> None:
+        stats = _REQUEST_STATS.get()
+        if stats is not None and _BUDGET_OVERRIDE.get() is None:
+            stats.statement_budget = max_statements
+
+    return Depends(_apply_query_budget)
+
+
+# For tests: requests served inside the block are strict, and max_statements, when
+# given, replaces the route's own budget. The app must run in the caller's context,
+# as it does behind httpx.ASGITransport.
+@contextmanager
+def enforce_query_budget(max_statements: int | None = None):
+    strict_token = _STRICT_BUDGET.set(True)
+    override_token = _BUDGET_OVERRIDE.set(max_statements)
+    try:
+        yield
+    finally:
+        _BUDGET_OVERRIDE.reset(override_token)
+        _STRICT_BUDGET.reset(strict_token)
+
+
+# App-level dependency: FastAPI only knows the matched route (and its path
+# template) after routing, which happens downstream of the middleware.
+async def bind_request_route(request: Request) -> None:
+    stats = _REQUEST_STATS.get()
+    route = request.scope.get("route")
+    if stats is None or stats.in_flight or route is None:
+        return
+    stats.route = getattr(route, "path", UNMATCHED_ROUTE)
+    stats.in_flight = True
+    IN_FLIGHT.inc((stats.method, stats.route))
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        # QueuePool._do_get recurses on overflow races; only time the outermost call.
+        if _IN_CHECKOUT.get():
+            return super()._do_get()
+        token = _IN_CHECKOUT.set(True)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc((_current_route(),))
+            raise
+        finally:
+            _IN_CHECKOUT.reset(token)
+            POOL_CHECKOUT_WAIT.observe((_current_route(),), time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _REQUEST_STATS.get()
+        if stats is not None:
+            if (
+                stats.statement_budget is not None
+                and stats.statements >= stats.statement_budget
+                and (_STRICT_BUDGET.get() or get_settings().db_query_budget_strict)
+            ):
+                raise QueryBudgetExceeded(
+                    f"{stats.method} {stats.route} exceeded its budget of "
+                    f"{stats.statement_budget} statements"
+                )
+            # Counted on start so concurrent reads (run_concurrently) cannot both
+            # slip under the budget before either finishes.
+            stats.statements += 1
+            stats.statement_counts[statement] = stats.statement_counts.get(statement, 0) + 1
+        context._metrics_started_at = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started_at
+        stats = _REQUEST_STATS.get()
+        route = stats.route if stats else BACKGROUND_ROUTE
+        if stats is not None:
+            stats.db_seconds += elapsed
+        DB_STATEMENTS.inc((route,))
+        DB_STATEMENT_TIME.inc((route,), elapsed)
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["metrics_checkout"] = (_current_route(), time.perf_counter())
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checkout = connection_record.info.pop("metrics_checkout", None)
+        if checkout is not None:
+            route, started_at = checkout
+            POOL_HOLD.observe((route,), time.perf_counter() - started_at)
+
+
+def render_metrics(engines: dict[str, AsyncEngine]) -> str:
+    lines: list[str] = []
+    for collector in _COLLECTORS:
+        lines.extend(collector.render())
+
+    pools = {name: engine.sync_engine.pool for name, engine in engines.items()}
+    pools = {name: pool for name, pool in pools.items() if isinstance(pool, AsyncAdaptedQueuePool)}
+    for name, help_text, read in (
+        ("db_pool_size", "Configured pool size.", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Connections currently checked out.", lambda pool: pool.checkedout()),
+        ("db_pool_overflow", "Connections open beyond pool_size.", lambda pool: max(pool.overflow(), 0)),
+        ("db_pool_idle", "Idle connections in the pool.", lambda pool: pool.checkedin()),
+    ):
+        lines.extend((f"# HELP {name} {help_text}", f"# TYPE {name} gauge"))
+        for pool_name, pool in sorted(pools.items()):
+            lines.append(f"{name}{_labels(('pool',), (pool_name,))} {_number(read(pool))}")
+    return "\n".join(lines) + "\n"
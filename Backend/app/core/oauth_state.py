@@ -0,0 +1,98 @@
+from functools import lru_cache
+import time
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.core.db import AsyncSessionLocal
+
+
+# PKCE code verifiers for the Google OAuth round trip, keyed by the state value.
+# States are single use: pop() returns the verifier at most once and only before
+# it expires. The memory store is per process, so it only works with a single
+# worker; the Postgres store is shared by all of them.
+
+
+class MemoryOAuthStateStore:
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        # Insertion order is expiry order since every entry gets the same TTL.
+        self._entries: dict[str, tuple[str, float]] = {}
+
+    def _sweep(self, now: float) -> None:
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if self._entries[oldest][1] > now and len(self._entries) < self._max_entries:
+                break
+            del self._entries[oldest]
+
+    async def put(self, state: str, code_verifier: str) -> None:
+        now = time.monotonic()
+        self._sweep(now)
+        self._entries[state] = (code_verifier, now + self._ttl_seconds)
+
+    async def pop(self, state: str) -> str | None:
+        entry = self._entries.pop(state, None)
+        if entry is None:
+            return None
+        code_verifier, expires_at = entry
+        if time.monotonic() > expires_at:
+            return None
+        return code_verifier
+
+
+# Backed by private.oauth_states, an unlogged table.
+class PostgresOAuthStateStore:
+    _PUT = text(
+        """
+        WITH swept AS (
+            DELETE FROM private.oauth_states WHERE expires_at < now()
+        )
+        INSERT INTO private.oauth_states (state, code_verifier, expires_at)
+        VALUES (:state, :code_verifier, now() + make_interval(secs => :ttl_seconds))
+        """
+    )
+    _POP = text(
+        """
+        DELETE FROM private.oauth_states
+        WHERE state = :state
+        RETURNING code_verifier, expires_at > now() AS is_valid
+        """
+    )
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl_seconds = ttl_seconds
+
+    async def put(self, state: str, code_verifier: str) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                self._PUT,
+                {"state": state, "code_verifier": code_verifier, "ttl_seconds": self._ttl_seconds},
+            )
+            await session.commit()
+
+    async def pop(self, state: str) -> str | None:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(self._POP, {"state": state})
+            row = result.mappings().one_or_none()
+            await session.commit()
+        if row is None or not row["is_valid"]:
+            return None
+        return row["code_verifier"]
+
+
+OAuthStateStore = MemoryOAuthStateStore | PostgresOAuthStateStore
+
+
+@lru_cache
+def get_oauth_state_store() -> OAuthStateStore:
+    settings = get_settings()
+    if settings.oauth_state_backend == "memory":
+        return MemoryOAuthStateStore(
+            settings.oauth_state_ttl_seconds,
+            settings.oauth_state_max_entries,
+        )
+    if settings.oauth_state_backend == "postgres":
+        return PostgresOAuthStateStore(settings.oauth_state_ttl_seconds)
+    raise ValueError(f"Unknown OAUTH_STATE_BACKEND: {settings.oauth_state_backend}")
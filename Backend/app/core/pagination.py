@@ -0,0 +1,45 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, tuple_
+
+from app.models import Capture
+
+CAPTURE_PAGE_DEFAULT = 100
+CAPTURE_PAGE_MAX = 500
+
+
+# Cursors are opaque to clients: base64("<captured_at iso>|<capture id>") of the
+# last row on the previous page. Pages are ordered by (captured_at, id) DESC so
+# the (…, captured_at) indexes on captures serve them without a full sort.
+def encode_capture_cursor(captured_at: datetime, capture_id: UUID) -> str:
+    raw = f"{captured_at.isoformat()}|{capture_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_capture_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        captured_at, capture_id = raw.split("|", 1)
+        return datetime.fromisoformat(captured_at), UUID(capture_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+def paginate_captures(stmt: Select, cursor: str | None, limit: int) -> Select:
+    if cursor:
+        captured_at, capture_id = decode_capture_cursor(cursor)
+        stmt = stmt.where(tuple_(Capture.captured_at, Capture.id) < tuple_(captured_at, capture_id))
+    # One extra row tells us whether another page exists.
+    return stmt.order_by(Capture.captured_at.desc(), Capture.id.desc()).limit(limit + 1)
+
+
+def split_capture_page(rows: list, limit: int) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_capture_cursor(last["captured_at"], last["capture_id"])
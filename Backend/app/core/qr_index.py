@@ -0,0 +1,168 @@
+import asyncio
+from dataclasses import dataclass
+import time
+from uuid import UUID
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.active_game import resolve_active_game
+from app.core.config import get_settings
+from app.models import Eyeball
+
+
+@dataclass(slots=True)
+class QrEntry:
+    id: UUID
+    game_id: UUID
+    qr_code: str
+    type_id: UUID
+    points: int
+    is_active: bool
+
+
+# game_id -> {qr_code and str(id) -> entry}, for the active game only. Captures
+# elsewhere reach us as 'eyeball' events (app/core/events.py) and flip is_active in
+# place; inserts, deletes and edits drop the game's index so the next scan reloads it.
+_INDEXES: dict[str, dict[str, QrEntry]] = {}
+_INDEX_EXPIRES: dict[str, float] = {}
+# Events that arrive while a game's index is loading are replayed onto the result;
+# a reload request during the load discards it.
+_LOADING: dict[str, list[tuple[str, bool]]] = {}
+_STALE_LOADS: set[str] = set()
+_LOCK = asyncio.Lock()
+
+# value -> monotonic deadline, for junk and unknown codes.
+_MISSING: dict[str, float] = {}
+_MISSING_MAX = 10000
+
+_ENTRY_COLUMNS = (
+    Eyeball.id,
+    Eyeball.game_id,
+    Eyeball.qr_code,
+    Eyeball.type_id,
+    Eyeball.point,
+    Eyeball.is_active,
+)
+
+
+def _entry(row) -> QrEntry:
+    return QrEntry(
+        id=row["id"],
+        game_id=row["game_id"],
+        qr_code=row["qr_code"],
+        type_id=row["type_id"],
+        points=row["point"],
+        is_active=row["is_active"],
+    )
+
+
+def invalidate_qr_index(game_id: str | None = None) -> None:
+    _MISSING.clear()
+    game_ids = list(_INDEXES) + list(_LOADING) if game_id is None else [str(game_id)]
+    for key in game_ids:
+        _INDEXES.pop(key, None)
+        _INDEX_EXPIRES.pop(key, None)
+        if key in _LOADING:
+            _STALE_LOADS.add(key)
+
+
+def set_eyeball_active(game_id: str, eyeball_id: str, is_active: bool) -> None:
+    game_key = str(game_id)
+    if game_key in _LOADING:
+        _LOADING[game_key].append((str(eyeball_id), is_active))
+    index = _INDEXES.get(game_key)
+    entry = index.get(str(eyeball_id)) if index is not None else None
+    if entry is not None:
+        entry.is_active = is_active
+
+
+async def _load_index(db: AsyncSession, game_id: str) -> dict[str, QrEntry]:
+    _LOADING[game_id] = []
+    try:
+        result = await db.execute(select(*_ENTRY_COLUMNS).where(Eyeball.game_id == game_id))
+        index = {}
+        for row in result.mappings():
+            entry = _entry(row)
+            index[entry.qr_code] = entry
+            index[str(entry.id)] = entry
+        for eyeball_id, is_active in _LOADING[game_id]:
+            entry = index.get(eyeball_id)
+            if entry is not None:
+                entry.is_active = is_active
+    finally:
+        del _LOADING[game_id]
+
+    if game_id in _STALE_LOADS:
+        _STALE_LOADS.discard(game_id)
+    else:
+        _INDEXES[game_id] = index
+        _INDEX_EXPIRES[game_id] = time.monotonic() + get_settings().qr_index_ttl_seconds
+    return index
+
+
+async def _game_index(db: AsyncSession, game_id: str) -> dict[str, QrEntry]:
+    index = _INDEXES.get(game_id)
+    if index is not None and _INDEX_EXPIRES[game_id] > time.monotonic():
+        return index
+
+    async with _LOCK:
+        # A concurrent caller may have loaded it while we waited.
+        index = _INDEXES.get(game_id)
+        if index is not None and _INDEX_EXPIRES[game_id] > time.monotonic():
+            return index
+        return await _load_index(db, game_id)
+
+
+def _is_missing(value: str) -> bool:
+    missing_until = _MISSING.get(value)
+    if missing_until is None:
+        return False
+    if missing_until <= time.monotonic():
+        _MISSING.pop(value, None)
+        return False
+    return True
+
+
+def _remember_missing(value: str) -> None:
+    now = time.monotonic()
+    if len(_MISSING) >= _MISSING_MAX:
+        for missing_value, missing_until in list(_MISSING.items()):
+            if missing_until <= now:
+                del _MISSING[missing_value]
+        if len(_MISSING) >= _MISSING_MAX:
+            _MISSING.clear()
+    _MISSING[value] = now + get_settings().qr_negative_cache_ttl_seconds
+
+
+def _as_uuid(value: str) -> UUID | None:
+    try:
+        return UUID(value)
+    except ValueError:
+        return None
+
+
+async def resolve_qr_value(db: AsyncSession, value: str) -> QrEntry | None:
+    if _is_missing(value):
+        return None
+
+    eyeball_id = _as_uuid(value)
+    game = await resolve_active_game(db)
+    if game is not None:
+        index = await _game_index(db, str(game.id))
+        entry = index.get(value)
+        if entry is None and eyeball_id is not None:
+            entry = index.get(str(eyeball_id))
+        if entry is not None:
+            return entry
+
+    # Eyeballs of other games are rare enough to look up directly.
+    condition = Eyeball.qr_code == value
+    if eyeball_id is not None:
+        condition = or_(condition, Eyeball.id == eyeball_id)
+    result = await db.execute(select(*_ENTRY_COLUMNS).where(condition).limit(1))
+    row = result.mappings().one_or_none()
+    if row is None:
+        _remember_missing(value)
+        return None
+    return _entry(row)
@@ -1,19 +1,34 @@
+import asyncio
+from collections import OrderedDict
 from dataclasses import dataclass
+import hashlib
 import logging
 import time
 
-import httpx
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwk, jwt
 
 from app.core.config import get_settings
+from app.core.http import get_http_client
 
 security = HTTPBearer()
 logger = logging.getLogger(__name__)
 
-_JWKS_CACHE: dict[str, object] = {"keys": None, "expires_at": 0.0}
+_JWKS_CACHE: dict[str, object] = {"keys": None, "expires_at": 0.0, "fetched_at": 0.0}
 _JWKS_TTL_SECONDS = 3600
+_JWKS_RETRY_SECONDS = 30
+_JWKS_MIN_REFRESH_SECONDS = 30
+# Single-flight guard: at most one JWKS fetch is in flight per process.
+_JWKS_LOCK = asyncio.Lock()
+_JWKS_REFRESH_TASK: asyncio.Task | None = None
+
+# Verified tokens keyed by sha256(token) -> (user, cache expiry). Entries never
+# outlive the token's own `exp`, so a cache hit is as good as a fresh decode.
+_TOKEN_CACHE: "OrderedDict[bytes, tuple[CurrentUser, float]]" = OrderedDict()
+_TOKEN_CACHE_MAX_ENTRIES = 10000
+# Constructed public keys keyed by `kid`; cleared whenever the JWKS is refetched.
+_KEY_CACHE: dict[str, object] = {}
 
 
 @dataclass
@@ -25,9 +40,13 @@ class CurrentUser:
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> CurrentUser:
-    settings = get_settings()
-
     token = credentials.credentials
+    token_digest = hashlib.sha256(token.encode("utf-8")).digest()
+    cached_user = _get_cached_user(token_digest)
+    if cached_user is not None:
+        return cached_user
+
+    settings = get_settings()
     try:
         header = jwt.get_unverified_header(token)
         alg = header.get("alg")
@@ -45,8 +64,18 @@ async def get_current_user(
                 options={"verify_aud": False},
             )
         elif alg == "ES256":
+            kid = header.get("kid")
             jwks = await _get_jwks(settings)
-            key = _select_jwk(jwks, header.get("kid"))
+            key = _select_jwk(jwks, kid)
+            if key is None:
+                # Unknown kid usually means the signing key was rotated; refetch once.
+                jwks = await _get_jwks(settings, force_refresh=True)
+                key = _select_jwk(jwks, kid)
+            if key is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Unable to select JWT signing key",
+                )
             payload = jwt.decode(
                 token,
                 key,
@@ -71,16 +100,76 @@ async def get_current_user(
             detail="Invalid authentication token",
         )
 
-    return CurrentUser(user_id=user_id, email=payload.get("email"))
+    user = CurrentUser(user_id=user_id, email=payload.get("email"))
+    _cache_user(token_digest, user, payload.get("exp"))
+    return user
 
 
-async def _get_jwks(settings) -> dict:
+def _get_cached_user(token_digest: bytes) -> CurrentUser | None:
+    entry = _TOKEN_CACHE.get(token_digest)
+    if entry is None:
+        return None
+    user, expires_at = entry
+    if time.time() >= expires_at:
+        _TOKEN_CACHE.pop(token_digest, None)
+        return None
+    _TOKEN_CACHE.move_to_end(token_digest)
+    return user
+
+
+def _cache_user(token_digest: bytes, user: CurrentUser, exp: object) -> None:
+    # Tokens without a numeric `exp` are never cached; we cannot bound their lifetime.
+    if not isinstance(exp, (int, float)) or exp <= time.time():
+        return
+    _TOKEN_CACHE[token_digest] = (user, float(exp))
+    _TOKEN_CACHE.move_to_end(token_digest)
+    while len(_TOKEN_CACHE) > _TOKEN_CACHE_MAX_ENTRIES:
+        _TOKEN_CACHE.popitem(last=False)
+
+
+async def _get_jwks(settings, force_refresh: bool = False) -> dict:
     now = time.time()
     cached_keys = _JWKS_CACHE.get("keys")
-    expires_at = _JWKS_CACHE.get("expires_at", 0.0)
-    if cached_keys and now < float(expires_at):
+    expires_at = float(_JWKS_CACHE.get("expires_at", 0.0))
+
+    if cached_keys and not force_refresh:
+        if now >= expires_at:
+            # Serve the stale keys and let a single background task refetch them.
+            _schedule_jwks_refresh(settings)
         return {"keys": cached_keys}
 
+    if cached_keys and now - float(_JWKS_CACHE.get("fetched_at", 0.0)) < _JWKS_MIN_REFRESH_SECONDS:
+        # An unknown kid must not turn every bad token into a JWKS fetch.
+        return {"keys": cached_keys}
+
+    return await _refresh_jwks(settings)
+
+
+async def _refresh_jwks(settings) -> dict:
+    started_at = time.time()
+    async with _JWKS_LOCK:
+        # Another request refreshed while we waited for the lock; reuse its result.
+        if _JWKS_CACHE.get("keys") and float(_JWKS_CACHE.get("fetched_at", 0.0)) >= started_at:
+            return {"keys": _JWKS_CACHE["keys"]}
+        return await _fetch_jwks(settings)
+
+
+def _schedule_jwks_refresh(settings) -> None:
+    global _JWKS_REFRESH_TASK
+    if _JWKS_REFRESH_TASK is not None and not _JWKS_REFRESH_TASK.done():
+        return
+    _JWKS_REFRESH_TASK = asyncio.create_task(_background_jwks_refresh(settings))
+
+
+async def _background_jwks_refresh(settings) -> None:
+    try:
+        await _refresh_jwks(settings)
+    except Exception:  # noqa: BLE001 - keep serving stale keys on failure
+        logger.exception("Background JWKS refresh failed; serving stale keys")
+        _JWKS_CACHE["expires_at"] = time.time() + _JWKS_RETRY_SECONDS
+
+
+async def _fetch_jwks(settings) -> dict:
     jwks_url = settings.supabase_jwks_url
     if not jwks_url:
         if not settings.supabase_url:
@@ -94,8 +183,7 @@ async def _get_jwks(settings) -> dict:
     if settings.supabase_anon_key:
         headers["apikey"] = settings.supabase_anon_key
 
-    async with httpx.AsyncClient(timeout=5) as client:
-        resp = await client.get(jwks_url, headers=headers)
+    resp = await get_http_client().get(jwks_url, headers=headers, timeout=5)
     if resp.status_code >= 400:
         logger.error("Failed to fetch JWKS: %s %s", resp.status_code, resp.text)
         raise HTTPException(
@@ -111,20 +199,31 @@ async def _get_jwks(settings) -> dict:
             detail="JWKS payload missing keys",
         )
 
+    now = time.time()
     _JWKS_CACHE["keys"] = keys
+    _KEY_CACHE.clear()
+    _JWKS_CACHE["fetched_at"] = now
     _JWKS_CACHE["expires_at"] = now + _JWKS_TTL_SECONDS
     return data
 
 
-def _select_jwk(jwks: dict, kid: str | None):
+def _select_jwk(jwks: dict, kid: str | None) -> object | None:
+    cache_key = kid or ""
+    cached_key = _KEY_CACHE.get(cache_key)
+    if cached_key is not None:
+        return cached_key
+
     keys = jwks.get("keys") or []
+    selected = None
     if kid:
         for key in keys:
             if key.get("kid") == kid:
-                return jwk.construct(key)
-    if len(keys) == 1:
-        return jwk.construct(keys[0])
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Unable to select JWT signing key",
-    )
+                selected = key
+                break
+    if selected is None and len(keys) == 1 and not (kid and keys[0].get("kid")):
+        selected = keys[0]
+    if selected is not None:
+        constructed = jwk.construct(selected)
+        _KEY_CACHE[cache_key] = constructed
+        return constructed
+    return None
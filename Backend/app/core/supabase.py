@@ -1,7 +1,7 @@
-import httpx
 import logging
 
 from app.core.config import get_settings
+from app.core.http import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +21,7 @@ async def supabase_signup(email: str, password: str) -> dict:
     }
     payload = {"email": email, "password": password}
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.post(url, json=payload, headers=headers)
+    resp = await get_http_client().post(url, json=payload, headers=headers, timeout=10)
 
     if resp.status_code >= 400:
         logger.error("Supabase signup error %s: %s", resp.status_code, resp.text)
@@ -44,8 +43,7 @@ async def supabase_login(email: str, password: str) -> dict:
     payload = {"email": email, "password": password}
 
     logger.info("Supabase login request url=%s email=%s", url, email)
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.post(url, json=payload, headers=headers)
+    resp = await get_http_client().post(url, json=payload, headers=headers, timeout=10)
 
     if resp.status_code >= 400:
         logger.error("Supabase login error %s: %s", resp.status_code, resp.text)
@@ -67,8 +65,7 @@ async def supabase_exchange_oauth_code(auth_code: str, code_verifier: str) -> di
     }
     payload = {"auth_code": auth_code, "code_verifier": code_verifier}
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.post(url, json=payload, headers=headers)
+    resp = await get_http_client().post(url, json=payload, headers=headers, timeout=10)
 
     if resp.status_code >= 400:
         raise SupabaseAuthError(resp.text)
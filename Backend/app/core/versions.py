@@ -0,0 +1,71 @@
+from fastapi import Request, Response, status
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# public.game_versions holds one counter per game. It is bumped in the same
+# transaction as every write that changes what a game's read endpoints return
+# (captures, group creation/joins, profile edits). Because the counter lives in
+# the database, every worker derives the same ETag for the same data.
+
+
+async def get_game_version(db: AsyncSession, game_id: str) -> int:
+    result = await db.execute(
+        text("SELECT version FROM public.game_versions WHERE game_id = CAST(:game_id AS uuid)"),
+        {"game_id": game_id},
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def get_group_game_version(db: AsyncSession, group_id: str) -> int | None:
+    result = await db.execute(
+        text(
+            """
+            SELECT COALESCE(gv.version, 0)
+            FROM public.groups g
+            LEFT JOIN public.game_versions gv ON gv.game_id = g.game_id
+            WHERE g.id = CAST(:group_id AS uuid)
+            """
+        ),
+        {"group_id": group_id},
+    )
+    return result.scalar_one_or_none()
+
+
+async def bump_user_game_versions(db: AsyncSession, user_id: str) -> None:
+    await db.execute(
+        text(
+            """
+            UPDATE public.game_versions gv
+            SET version = gv.version + 1
+            FROM public.group_members gm
+            JOIN public.groups g ON g.id = gm.group_id
+            WHERE gm.user_id = CAST(:user_id AS uuid)
+              AND gv.game_id = g.game_id
+            """
+        ),
+        {"user_id": user_id},
+    )
+
+
+def make_etag(scope: str, key: str, version: int) -> str:
+    return f'"{scope}-{key}-{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {value.strip().removeprefix("W/") for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
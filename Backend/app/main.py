@@ -1,11 +1,17 @@
+from contextlib import asynccontextmanager
 import logging
 import time
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
-from app.routes import auth, captures, eyeballs, games, groups, scores, system, users
+from app.core.db import READ_YOUR_WRITES_HEADER, AsyncSessionLocal
+from app.core.events import start_event_listener, stop_event_listener
+from app.core.eyeball_types import get_eyeball_types
+from app.core.http import close_http_client, start_http_client
+from app.core.metrics import bind_request_route, track_request
+from app.routes import auth, captures, eyeballs, games, groups, metrics, scores, system, users
 from app.summary import router as summary_router
 
 logging.basicConfig(
@@ -16,7 +22,29 @@ logging.basicConfig(
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Nupzuki Hunter API", version=settings.project_version)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    await start_event_listener()
+    try:
+        async with AsyncSessionLocal() as db:
+            await get_eyeball_types(db)
+    except Exception:  # noqa: BLE001 - loaded on first use instead
+        logger.warning("Could not preload eyeball types", exc_info=True)
+    try:
+        yield
+    finally:
+        await stop_event_listener()
+        await close_http_client()
+
+
+app = FastAPI(
+    title="Nupzuki Hunter API",
+    version=settings.project_version,
+    lifespan=lifespan,
+    dependencies=[Depends(bind_request_route)],
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,38 +52,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_YOUR_WRITES_HEADER],
 )
 
 @app.middleware("http")
 async def log_requests(request, call_next):
     start = time.time()
-    try:
-        response = await call_next(request)
-    except Exception:
-        duration_ms = (time.time() - start) * 1000
-        client_host = request.client.host if request.client else "-"
-        logger.exception(
-            "HTTP %s %s status=500 duration_ms=%.1f client=%s",
-            request.method,
-            request.url.path,
-            duration_ms,
-            client_host,
-        )
-        raise
+    with track_request(request.method) as stats:
+        try:
+            response = await call_next(request)
+        except Exception:
+            duration_ms = (time.time() - start) * 1000
+            client_host = request.client.host if request.client else "-"
+            logger.exception(
+                "HTTP %s %s status=500 duration_ms=%.1f db_statements=%d db_ms=%.1f client=%s",
+                request.method,
+                request.url.path,
+                duration_ms,
+                stats.statements,
+                stats.db_seconds * 1000,
+                client_host,
+            )
+            raise
+        stats.status_code = response.status_code
+        if settings.db_debug_headers:
+            response.headers["Server-Timing"] = (
+                f'db;dur={stats.db_seconds * 1000:.1f};desc="statements={stats.statements}"'
+            )
+            response.headers["X-DB-Statements"] = str(stats.statements)
 
     duration_ms = (time.time() - start) * 1000
     client_host = request.client.host if request.client else "-"
     logger.info(
-        "HTTP %s %s status=%s duration_ms=%.1f client=%s",
+        "HTTP %s %s status=%s duration_ms=%.1f db_statements=%d db_ms=%.1f client=%s",
         request.method,
         request.url.path,
         response.status_code,
         duration_ms,
+        stats.statements,
+        stats.db_seconds * 1000,
         client_host,
     )
     return response
 
 app.include_router(system.router)
+app.include_router(metrics.router)
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(games.router)
@@ -63,7 +63,7 @@ class Group(Base):
     __tablename__ = "groups"
     __table_args__ = (UniqueConstraint("code"), {"schema": "public"})
 
-    id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    id: Mapped[str] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     game_id: Mapped[str] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("public.games.id", ondelete="CASCADE"),
@@ -73,6 +73,7 @@ class Group(Base):
     name: Mapped[str | None] = mapped_column(Text)
     owner_id: Mapped[str | None] = mapped_column(UUID(as_uuid=True), ForeignKey("auth.users.id"))
     max_members: Mapped[int] = mapped_column(Integer, server_default="6", nullable=False)
+    member_count: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -131,6 +132,23 @@ class Eyeball(Base):
 
 
 
+class EyeballActiveCount(Base):
+    __tablename__ = "eyeball_active_counts"
+    __table_args__ = {"schema": "public"}
+
+    game_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("public.games.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    type_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("public.eyeball_types.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    active_count: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+
+
 class Capture(Base):
     __tablename__ = "captures"
     __table_args__ = (
@@ -181,6 +199,27 @@ class GroupScore(Base):
     )
 
 
+class GroupTotal(Base):
+    __tablename__ = "group_totals"
+    __table_args__ = {"schema": "public"}
+
+    group_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("public.groups.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    game_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("public.games.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    total_score: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    captures_count: Mapped[int] = mapped_column(Integer, server_default="0", nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
 class PersonalScore(Base):
     __tablename__ = "personal_scores"
     __table_args__ = (
@@ -1,4 +1,3 @@
-from datetime import datetime, timedelta
 import base64
 import hashlib
 import logging
@@ -6,28 +5,23 @@ import secrets
 from urllib.parse import urlencode
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, text
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.db import get_db
+from app.core.oauth_state import get_oauth_state_store
 from app.core.supabase import (
     SupabaseAuthError,
     supabase_exchange_oauth_code,
     supabase_login,
     supabase_signup,
 )
-from app.models import UserProfile
 from app.schemas import LoginRequest, SignupRequest
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 logger = logging.getLogger(__name__)
 
-_OAUTH_STATE_TTL = timedelta(minutes=10)
-_oauth_state_store: dict[str, tuple[str, datetime]] = {}
-
-
 def _mask_email(email: str | None) -> str:
     if not email:
         return "-"
@@ -44,18 +38,33 @@ def _build_pkce_pair() -> tuple[str, str]:
     return code_verifier, code_challenge
 
 
-def _store_state(state: str, code_verifier: str) -> None:
-    _oauth_state_store[state] = (code_verifier, datetime.utcnow() + _OAUTH_STATE_TTL)
-
+# Resolves the auth user (by id, falling back to email) and creates the profile
+# if it is missing, in one statement. An existing profile is left untouched.
+_ENSURE_PROFILE_STMT = text(
+    """
+    WITH auth_user AS (
+        SELECT id FROM auth.users WHERE id = CAST(:user_id AS uuid)
+        UNION ALL
+        SELECT id FROM auth.users WHERE email = :email
+        LIMIT 1
+    ),
+    inserted AS (
+        INSERT INTO public.users (id, nickname, avatar_url)
+        SELECT id, :nickname, :avatar_url FROM auth_user
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id
+    )
+    SELECT a.id AS auth_id, i.id IS NOT NULL AS created
+    FROM (SELECT 1) AS one
+    LEFT JOIN auth_user a ON true
+    LEFT JOIN inserted i ON true
+    """
+)
 
-def _consume_state(state: str) -> str | None:
-    entry = _oauth_state_store.pop(state, None)
-    if not entry:
-        return None
-    code_verifier, expires_at = entry
-    if datetime.utcnow() > expires_at:
-        return None
-    return code_verifier
+# user_id -> auth id of users already known to have a profile in this process, so
+# repeat logins skip the database. Profiles are never deleted by the API.
+_KNOWN_PROFILES: dict[str, str] = {}
+_KNOWN_PROFILES_MAX = 100000
 
 
 async def ensure_profile(
@@ -64,57 +73,34 @@ async def ensure_profile(
     nickname: str | None,
     avatar_url: str | None,
     email: str | None,
-) -> UserProfile | None:
-    auth_id = await _resolve_auth_user_id(session, user_id, email)
-    if not auth_id:
-        logger.error("Auth user not found in DB for user_id=%s email=%s", user_id, email)
-        return None
-
-    user_id = auth_id
-    stmt = select(UserProfile).where(UserProfile.id == user_id)
-    result = await session.execute(stmt)
-    profile = result.scalar_one_or_none()
-    if profile:
-        return profile
+) -> str | None:
+    auth_id = _KNOWN_PROFILES.get(user_id)
+    if auth_id:
+        return auth_id
 
     if not nickname and email:
         nickname = email.split("@", 1)[0]
 
-    profile = UserProfile(
-        id=user_id,
-        nickname=nickname or "player",
-        avatar_url=avatar_url,
+    result = await session.execute(
+        _ENSURE_PROFILE_STMT,
+        {
+            "user_id": user_id,
+            "email": email,
+            "nickname": nickname or "player",
+            "avatar_url": avatar_url,
+        },
     )
-    session.add(profile)
-    try:
-        await session.commit()
-        await session.refresh(profile)
-        return profile
-    except IntegrityError:
-        await session.rollback()
-        logger.error("Failed to insert user profile for user_id=%s", user_id)
+    row = result.mappings().one()
+    if not row["auth_id"]:
+        logger.error("Auth user not found in DB for user_id=%s email=%s", user_id, email)
         return None
+    if row["created"]:
+        await session.commit()
 
-
-async def _resolve_auth_user_id(
-    session: AsyncSession,
-    user_id: str,
-    email: str | None,
-) -> str | None:
-    exists_stmt = text("SELECT id FROM auth.users WHERE id = :user_id")
-    exists_result = await session.execute(exists_stmt, {"user_id": user_id})
-    row = exists_result.first()
-    if row:
-        return str(row[0])
-
-    if email:
-        email_stmt = text("SELECT id FROM auth.users WHERE email = :email")
-        email_result = await session.execute(email_stmt, {"email": email})
-        email_row = email_result.first()
-        if email_row:
-            return str(email_row[0])
-
-    return None
+    if len(_KNOWN_PROFILES) >= _KNOWN_PROFILES_MAX:
+        _KNOWN_PROFILES.clear()
+    _KNOWN_PROFILES[user_id] = str(row["auth_id"])
+    return _KNOWN_PROFILES[user_id]
 
 
 @router.post("/signup")
@@ -190,7 +176,7 @@ async def google_login():
 
     state = secrets.token_urlsafe(16)
     code_verifier, code_challenge = _build_pkce_pair()
-    _store_state(state, code_verifier)
+    await get_oauth_state_store().put(state, code_verifier)
 
     query = urlencode(
         {
@@ -218,7 +204,7 @@ async def google_callback(
             detail="Missing code or state in callback",
         )
 
-    code_verifier = _consume_state(state)
+    code_verifier = await get_oauth_state_store().pop(state)
     if not code_verifier:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
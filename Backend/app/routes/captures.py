@@ -1,170 +1,173 @@
-from uuid import uuid4
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select, text, update
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.db import get_db, pin_primary
+from app.core.metrics import query_budget
+from app.core.qr_index import set_eyeball_active
 from app.core.security import CurrentUser, get_current_user
-from app.models import (
-    Capture,
-    CaptureEvent,
-    Eyeball,
-    EyeballType,
-    Group,
-    GroupMember,
-)
 from app.schemas import CaptureCreateRequest
 
 router = APIRouter(prefix="/captures", tags=["captures"])
 
-
-@router.post("")
-async def create_capture(
-    payload: CaptureCreateRequest,
-    current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    eyeball_stmt = (
-        select(
-            Eyeball.id,
-            Eyeball.game_id,
-            Eyeball.type_id,
-            Eyeball.is_active,
-            Eyeball.point,
-            EyeballType.event_type,
-            EyeballType.payload,
-        )
-        .join(EyeballType, EyeballType.id == Eyeball.type_id)
-        .where(Eyeball.id == payload.eyeball_id)
-    )
-    eyeball_result = await db.execute(eyeball_stmt)
-    eyeball = eyeball_result.mappings().one_or_none()
-    if not eyeball:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Eyeball not found")
-
-    if not eyeball["is_active"]:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Eyeball inactive")
-
-    group_id = payload.group_id
-    if not group_id:
-        group_stmt = (
-            select(GroupMember.group_id)
-            .join(Group, Group.id == GroupMember.group_id)
-            .where(GroupMember.user_id == current_user.user_id)
-            .where(Group.game_id == eyeball["game_id"])
-            .limit(1)
-        )
-        group_result = await db.execute(group_stmt)
-        group_id = group_result.scalar_one_or_none()
-        if not group_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="group_id is required when user has no group",
-            )
-
-    member_stmt = (
-        select(GroupMember)
-        .where(GroupMember.group_id == group_id)
-        .where(GroupMember.user_id == current_user.user_id)
-    )
-    member_result = await db.execute(member_stmt)
-    if not member_result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not in group")
-
-    group_check = select(Group.id).where(Group.id == group_id).where(Group.game_id == eyeball["game_id"])
-    group_check_result = await db.execute(group_check)
-    if not group_check_result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Group mismatch for game")
-
-    dup_stmt = (
-        select(Capture)
-        .where(Capture.game_id == eyeball["game_id"])
-        .where(Capture.eyeball_id == payload.eyeball_id)
-    )
-    dup_result = await db.execute(dup_stmt)
-    if dup_result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already captured")
-
-    capture = Capture(
-        id=uuid4(),
-        game_id=eyeball["game_id"],
-        group_id=group_id,
-        user_id=current_user.user_id,
-        eyeball_id=payload.eyeball_id,
-        image_url=payload.image_url,
-    )
-    db.add(capture)
-    await db.flush()
-
-    points = eyeball["point"]
-
-    group_upsert = text(
-        """
+# The whole capture runs as one statement. The eyeball is claimed with a
+# conditional UPDATE. A concurrent scan blocks on that row lock and then sees
+# is_active = false, so it gets a 409 instead of an IntegrityError.
+# The diagnostic columns (eyeball_found, was_active, in_group, game_matches)
+# come from the statement snapshot and give the reason when nothing was claimed.
+_CAPTURE_STMT = text(
+    """
+    WITH eb AS (
+        SELECT e.id, e.game_id, e.point, e.is_active, t.event_type, t.payload
+        FROM public.eyeballs e
+        JOIN public.eyeball_types t ON t.id = e.type_id
+        WHERE e.id = CAST(:eyeball_id AS uuid)
+    ),
+    grp AS (
+        SELECT gm.group_id, g.game_id = eb.game_id AS game_matches
+        FROM eb
+        JOIN public.groups g
+          ON (CAST(:group_id AS uuid) IS NULL AND g.game_id = eb.game_id)
+          OR g.id = CAST(:group_id AS uuid)
+        JOIN public.group_members gm
+          ON gm.group_id = g.id AND gm.user_id = CAST(:user_id AS uuid)
+        LIMIT 1
+    ),
+    claimed AS (
+        UPDATE public.eyeballs e
+        SET is_active = false
+        FROM grp
+        WHERE e.id = CAST(:eyeball_id AS uuid)
+          AND e.is_active
+          AND grp.game_matches
+        RETURNING e.id, e.game_id, e.point
+    ),
+    cap AS (
+        INSERT INTO public.captures (id, game_id, group_id, user_id, eyeball_id, image_url)
+        SELECT gen_random_uuid(), c.game_id, grp.group_id, CAST(:user_id AS uuid), c.id, :image_url
+        FROM claimed c CROSS JOIN grp
+        ON CONFLICT (game_id, eyeball_id) DO NOTHING
+        RETURNING id, game_id, group_id, user_id, eyeball_id, captured_at, image_url
+    ),
+    group_score AS (
         INSERT INTO public.group_scores (group_id, user_id, score, captures_count)
-        VALUES (:group_id, :user_id, :score, :captures)
+        SELECT cap.group_id, cap.user_id, c.point, 1
+        FROM cap CROSS JOIN claimed c
         ON CONFLICT (group_id, user_id)
         DO UPDATE SET score = public.group_scores.score + EXCLUDED.score,
                       captures_count = public.group_scores.captures_count + EXCLUDED.captures_count,
                       updated_at = now()
-        """
-    )
-    await db.execute(
-        group_upsert,
-        {
-            "group_id": group_id,
-            "user_id": current_user.user_id,
-            "score": points,
-            "captures": 1,
-        },
-    )
-
-    personal_upsert = text(
-        """
+    ),
+    group_total AS (
+        INSERT INTO public.group_totals (group_id, game_id, total_score, captures_count)
+        SELECT cap.group_id, cap.game_id, c.point, 1
+        FROM cap CROSS JOIN claimed c
+        ON CONFLICT (group_id)
+        DO UPDATE SET total_score = public.group_totals.total_score + EXCLUDED.total_score,
+                      captures_count = public.group_totals.captures_count + EXCLUDED.captures_count,
+                      updated_at = now()
+    ),
+    personal_score AS (
         INSERT INTO public.personal_scores (game_id, user_id, score, captures_count)
-        VALUES (:game_id, :user_id, :score, :captures)
+        SELECT cap.game_id, cap.user_id, c.point, 1
+        FROM cap CROSS JOIN claimed c
         ON CONFLICT (game_id, user_id)
         DO UPDATE SET score = public.personal_scores.score + EXCLUDED.score,
                       captures_count = public.personal_scores.captures_count + EXCLUDED.captures_count,
                       updated_at = now()
-        """
+    ),
+    game_version AS (
+        INSERT INTO public.game_versions (game_id, version)
+        SELECT cap.game_id, 1 FROM cap
+        ON CONFLICT (game_id)
+        DO UPDATE SET version = public.game_versions.version + 1
+    ),
+    events AS (
+        INSERT INTO public.capture_events (capture_id, event_type, payload)
+        SELECT cap.id, eb.event_type, eb.payload
+        FROM cap CROSS JOIN eb
+        WHERE eb.event_type IS NOT NULL
+        RETURNING event_type, payload
     )
-    await db.execute(
-        personal_upsert,
+    SELECT eb.id IS NOT NULL AS eyeball_found,
+           COALESCE(eb.is_active, false) AS was_active,
+           grp.group_id IS NOT NULL AS in_group,
+           COALESCE(grp.game_matches, false) AS game_matches,
+           cap.id,
+           cap.game_id,
+           cap.group_id,
+           cap.user_id,
+           cap.eyeball_id,
+           cap.captured_at,
+           cap.image_url,
+           eb.point AS points,
+           COALESCE(
+               (SELECT jsonb_agg(jsonb_build_object('event_type', ev.event_type, 'payload', ev.payload))
+                FROM events ev),
+               '[]'::jsonb
+           ) AS events
+    FROM (SELECT 1) AS one
+    LEFT JOIN eb ON true
+    LEFT JOIN grp ON true
+    LEFT JOIN cap ON true
+    """
+).columns(events=JSONB)
+
+
+@router.post("", dependencies=[query_budget(1)])
+async def create_capture(
+    payload: CaptureCreateRequest,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    result = await db.execute(
+        _CAPTURE_STMT,
         {
-            "game_id": eyeball["game_id"],
+            "eyeball_id": payload.eyeball_id,
+            "group_id": payload.group_id,
             "user_id": current_user.user_id,
-            "score": points,
-            "captures": 1,
+            "image_url": payload.image_url,
         },
     )
+    row = result.mappings().one()
 
-    events = []
-    if eyeball["event_type"]:
-        capture_event = CaptureEvent(
-            capture_id=capture.id,
-            event_type=eyeball["event_type"],
-            payload=eyeball["payload"],
+    # Nothing is committed unless the capture row was inserted; the session
+    # rolls back the claim on the error paths below.
+    if not row["eyeball_found"]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Eyeball not found")
+
+    if not row["was_active"]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Eyeball inactive")
+
+    if not row["in_group"]:
+        if payload.group_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not in group")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="group_id is required when user has no group",
         )
-        db.add(capture_event)
-        events.append({"event_type": eyeball["event_type"], "payload": eyeball["payload"]})
 
-    await db.execute(
-        update(Eyeball)
-        .where(Eyeball.id == payload.eyeball_id)
-        .values(is_active=False)
-    )
+    if not row["game_matches"]:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Group mismatch for game")
+
+    if row["id"] is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already captured")
 
     await db.commit()
+    pin_primary(current_user.user_id, response)
+    # Other workers hear about it through the eyeballs NOTIFY trigger.
+    set_eyeball_active(row["game_id"], row["eyeball_id"], False)
 
     return {
-        "id": capture.id,
-        "game_id": capture.game_id,
-        "group_id": capture.group_id,
-        "user_id": capture.user_id,
-        "eyeball_id": capture.eyeball_id,
-        "captured_at": capture.captured_at,
-        "image_url": capture.image_url,
-        "points": points,
-        "events": events,
+        "id": row["id"],
+        "game_id": row["game_id"],
+        "group_id": row["group_id"],
+        "user_id": row["user_id"],
+        "eyeball_id": row["eyeball_id"],
+        "captured_at": row["captured_at"],
+        "image_url": row["image_url"],
+        "points": row["points"],
+        "events": row["events"],
     }
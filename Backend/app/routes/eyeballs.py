@@ -1,94 +1,173 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from uuid import uuid4
-from sqlalchemy import func, or_, select
+from collections.abc import AsyncIterator
+import json
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.active_game import resolve_active_game_id
+from app.core.db import AsyncSessionLocal, get_db
+from app.core.eyeball_types import (
+    EyeballTypeInfo,
+    count_by_type_name,
+    eyeball_type_names,
+    get_eyeball_types,
+)
+from app.core.metrics import query_budget
+from app.core.qr_index import resolve_qr_value
 from app.core.security import CurrentUser, get_current_user
-from app.models import Eyeball, EyeballType, Game
+from app.models import Eyeball, EyeballActiveCount
 from app.schemas import EyeballBulkCreateRequest
 
 router = APIRouter(prefix="/eyeballs", tags=["eyeballs"])
+logger = logging.getLogger(__name__)
 
 
-@router.get("/active/counts")
+@router.get("/active/counts", dependencies=[query_budget(2)])
 async def get_active_counts(
     game_id: str | None = None,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    join_condition = (Eyeball.type_id == EyeballType.id) & (Eyeball.is_active.is_(True))
+    # eyeball_active_counts is maintained by triggers on eyeballs; one row per game and type.
+    stmt = select(
+        EyeballActiveCount.type_id,
+        func.sum(EyeballActiveCount.active_count).label("count"),
+    ).group_by(EyeballActiveCount.type_id)
     if game_id:
-        join_condition = join_condition & (Eyeball.game_id == game_id)
-
-    stmt = (
-        select(EyeballType.name.label("type_name"), func.count(Eyeball.id).label("count"))
-        .outerjoin(Eyeball, join_condition)
-        .group_by(EyeballType.name)
-    )
+        stmt = stmt.where(EyeballActiveCount.game_id == game_id)
 
     result = await db.execute(stmt)
-    return {row["type_name"]: row["count"] for row in result.mappings().all()}
+    rows = result.mappings().all()
+    types = await get_eyeball_types(db, [row["type_id"] for row in rows])
+    return count_by_type_name(types, [(row["type_id"], row["count"]) for row in rows])
+
+
+EYEBALL_BULK_BATCH_SIZE = 5000
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Ids are generated server-side and double as the QR value, so a batch of any
+# size is one statement with a constant parameter count.
+_BULK_INSERT = text(
+    """
+    INSERT INTO public.eyeballs (id, game_id, type_id, qr_code, point, is_active)
+    SELECT new.id, CAST(:game_id AS uuid), CAST(:type_id AS uuid), new.id::text, :point, :is_active
+    FROM (SELECT gen_random_uuid() AS id FROM generate_series(1, :count)) AS new
+    RETURNING id, qr_code
+    """
+)
+
+
+async def _insert_eyeball_batches(
+    db: AsyncSession,
+    game_id: str,
+    types: list[EyeballTypeInfo],
+    payload: EyeballBulkCreateRequest,
+) -> AsyncIterator[list[dict]]:
+    for type_info in types:
+        remaining = payload.per_type_count
+        while remaining > 0:
+            count = min(remaining, EYEBALL_BULK_BATCH_SIZE)
+            remaining -= count
+            result = await db.execute(
+                _BULK_INSERT,
+                {
+                    "game_id": str(game_id),
+                    "type_id": str(type_info.id),
+                    "point": payload.point,
+                    "is_active": payload.is_active,
+                    "count": count,
+                },
+            )
+            yield [
+                {
+                    "id": str(row["id"]),
+                    "qr_code": row["qr_code"],
+                    "type_id": str(type_info.id),
+                    "type_name": type_info.name,
+                }
+                for row in result.mappings()
+            ]
+
+
+def _ndjson_lines(batch: list[dict]) -> str:
+    return "".join(json.dumps(item) + "\n" for item in batch)
+
+
+async def _stream_eyeball_batches(
+    db: AsyncSession,
+    game_id: str,
+    first_batch: list[dict],
+    batches: AsyncIterator[list[dict]],
+) -> AsyncIterator[str]:
+    # Each batch is committed before its lines go out, so every streamed row exists
+    # even if the stream is cut short. The closing line carries the total, and an
+    # "error" key when a later batch failed after the 200 had been sent.
+    total = len(first_batch)
+    try:
+        yield _ndjson_lines(first_batch)
+        async for batch in batches:
+            await db.commit()
+            total += len(batch)
+            yield _ndjson_lines(batch)
+    except Exception:
+        logger.exception("Bulk eyeball stream failed after %d rows for game_id=%s", total, game_id)
+        await db.rollback()
+        yield json.dumps(
+            {"game_id": str(game_id), "created_count": total, "error": "Bulk insert failed"}
+        ) + "\n"
+        return
+    finally:
+        await db.close()
+    yield json.dumps({"game_id": str(game_id), "created_count": total}) + "\n"
 
 
 @router.post("/bulk")
 async def bulk_create_eyeballs(
     payload: EyeballBulkCreateRequest,
+    request: Request,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     game_id = payload.game_id
     if not game_id:
-        game_stmt = (
-            select(Game.id)
-            .where(Game.status.in_(["lobby", "playing"]))
-            .where(Game.expires_at > func.now())
-            .order_by(Game.created_at.desc())
-            .limit(1)
-        )
-        game_result = await db.execute(game_stmt)
-        game_id = game_result.scalar_one_or_none()
+        game_id = await resolve_active_game_id(db)
         if not game_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Active game not found",
             )
 
-    types_stmt = select(EyeballType.id, EyeballType.name)
-    types_result = await db.execute(types_stmt)
-    types = types_result.mappings().all()
+    types = list((await get_eyeball_types(db)).values())
     if not types:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Eyeball types not found",
         )
 
-    created = []
-    eyeballs = []
-    for type_row in types:
-        for _ in range(payload.per_type_count):
-            eyeball_id = uuid4()
-            qr_value = str(eyeball_id)
-            eyeballs.append(
-                Eyeball(
-                    id=eyeball_id,
-                    game_id=game_id,
-                    type_id=type_row["id"],
-                    qr_code=qr_value,
-                    point=payload.point,
-                    is_active=payload.is_active,
-                )
-            )
-            created.append(
-                {
-                    "id": eyeball_id,
-                    "qr_code": qr_value,
-                    "type_id": type_row["id"],
-                    "type_name": type_row["name"],
-                }
-            )
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        # The stream commits on its own session; return this connection now.
+        await db.close()
+        stream_db = AsyncSessionLocal()
+        batches = _insert_eyeball_batches(stream_db, game_id, types, payload)
+        # The first batch runs before the response starts, so a bad game_id fails
+        # the request instead of ending a 200 stream early.
+        try:
+            first_batch = await anext(batches)
+            await stream_db.commit()
+        except BaseException:
+            await stream_db.close()
+            raise
+        return StreamingResponse(
+            _stream_eyeball_batches(stream_db, game_id, first_batch, batches),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
 
-    db.add_all(eyeballs)
+    created = []
+    async for batch in _insert_eyeball_batches(db, game_id, types, payload):
+        created.extend(batch)
     await db.commit()
 
     return {"game_id": game_id, "created": created}
@@ -108,9 +187,7 @@ async def get_eyeball(
             Eyeball.type_id,
             Eyeball.point,
             Eyeball.is_active,
-            EyeballType.name.label("type_name"),
         )
-        .join(EyeballType, EyeballType.id == Eyeball.type_id)
         .where(Eyeball.id == eyeball_id)
     )
     result = await db.execute(stmt)
@@ -119,13 +196,14 @@ async def get_eyeball(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Eyeball not found")
 
     points = row["point"]
+    type_names = await eyeball_type_names(db, [row["type_id"]])
 
     return {
         "id": row["id"],
         "game_id": row["game_id"],
         "qr_code": row["qr_code"],
         "is_active": row["is_active"],
-        "type_name": row["type_name"],
+        "type_name": type_names.get(row["type_id"]),
         "type_id": row["type_id"],
         "points": points,
     }
@@ -153,39 +231,25 @@ async def ensure_qr_code(
     }
 
 
-@router.get("/qr/resolve")
+@router.get("/qr/resolve", dependencies=[query_budget(4)])
 async def resolve_qr(
     value: str,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = (
-        select(
-            Eyeball.id,
-            Eyeball.game_id,
-            Eyeball.qr_code,
-            Eyeball.type_id,
-            Eyeball.point,
-            Eyeball.is_active,
-            EyeballType.name.label("type_name"),
-        )
-        .join(EyeballType, EyeballType.id == Eyeball.type_id)
-        .where(or_(Eyeball.id == value, Eyeball.qr_code == value))
-        .limit(1)
-    )
-    result = await db.execute(stmt)
-    row = result.mappings().one_or_none()
-    if not row:
+    # Served from memory for the active game. The budget covers a cold start: active
+    # game, index load, direct lookup of another game's eyeball, type catalog.
+    entry = await resolve_qr_value(db, value)
+    if entry is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Eyeball not found")
-
-    points = row["point"]
+    type_names = await eyeball_type_names(db, [entry.type_id])
 
     return {
-        "id": row["id"],
-        "game_id": row["game_id"],
-        "qr_code": row["qr_code"],
-        "is_active": row["is_active"],
-        "type_name": row["type_name"],
-        "type_id": row["type_id"],
-        "points": points,
+        "id": entry.id,
+        "game_id": entry.game_id,
+        "qr_code": entry.qr_code,
+        "is_active": entry.is_active,
+        "type_name": type_names.get(entry.type_id),
+        "type_id": entry.type_id,
+        "points": entry.points,
     }
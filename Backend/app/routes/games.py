@@ -1,28 +1,127 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select, text
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.active_game import resolve_active_game
+from app.core.config import get_settings
+from app.core.db import get_db, get_read_db, run_concurrently
+from app.core.metrics import query_budget
+from app.core.events import LeaderboardSubscription, subscribe_leaderboard
+from app.core.eyeball_types import eyeball_type_names
+from app.core.pagination import (
+    CAPTURE_PAGE_DEFAULT,
+    CAPTURE_PAGE_MAX,
+    paginate_captures,
+    split_capture_page,
+)
 from app.core.security import CurrentUser, get_current_user
-from app.models import Capture, Eyeball, EyeballType, Game, Group, UserProfile
+from app.core.versions import etag_matches, get_game_version, make_etag, not_modified, set_etag
+from app.models import Capture, Eyeball, Group, UserProfile
+from app.schemas import (
+    GameCapturesResponse,
+    GameEyeballsResponse,
+    GameLeaderboardResponse,
+    GameResultResponse,
+)
 
 router = APIRouter(prefix="/games", tags=["games"])
 
 
+async def _leaderboard_events(
+    request: Request,
+    game_id: str,
+    leaderboard: list[dict],
+    subscription: LeaderboardSubscription,
+    stack: AsyncExitStack,
+) -> AsyncIterator[str]:
+    heartbeat = get_settings().realtime_heartbeat_seconds
+    async with stack:
+        yield _sse_event("snapshot", {"game_id": game_id, "leaderboard": leaderboard})
+        while not await request.is_disconnected():
+            deltas = await subscription.next_batch(timeout=heartbeat)
+            if not deltas:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse_event("delta", {"game_id": game_id, "groups": deltas})
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def _fetch_group_leaderboard(db: AsyncSession, game_id: str) -> list[dict]:
+    stmt = text(
+        """
+        SELECT gt.group_id,
+               g.name,
+               g.code,
+               gt.total_score,
+               gt.captures_count,
+               gt.updated_at
+        FROM public.group_totals gt
+        JOIN public.groups g ON g.id = gt.group_id
+        WHERE gt.game_id = :game_id
+        ORDER BY gt.total_score DESC, gt.updated_at ASC
+        """
+    )
+    result = await db.execute(stmt, {"game_id": game_id})
+    return [
+        {
+            "group_id": row["group_id"],
+            "name": row["name"],
+            "code": row["code"],
+            "score": row["total_score"],
+            "captures_count": row["captures_count"],
+            "updated_at": row["updated_at"],
+        }
+        for row in result.mappings().all()
+    ]
+
+
+async def _fetch_personal_leaderboard(db: AsyncSession, game_id: str) -> list[dict]:
+    stmt = text(
+        """
+        SELECT gm.user_id,
+               COALESCE(ps.score, 0) AS score,
+               COALESCE(ps.captures_count, 0) AS captures_count,
+               ps.updated_at,
+               u.nickname,
+               u.avatar_url
+        FROM public.group_members gm
+        JOIN public.groups g ON g.id = gm.group_id
+        JOIN public.users u ON u.id = gm.user_id
+        LEFT JOIN public.personal_scores ps
+               ON ps.game_id = :game_id AND ps.user_id = gm.user_id
+        WHERE g.game_id = :game_id
+        ORDER BY score DESC, ps.updated_at ASC NULLS LAST
+        """
+    )
+    result = await db.execute(stmt, {"game_id": game_id})
+    return [
+        {
+            "user_id": row["user_id"],
+            "score": row["score"],
+            "captures_count": row["captures_count"],
+            "nickname": row["nickname"],
+            "avatar_url": row["avatar_url"],
+            "updated_at": row["updated_at"],
+        }
+        for row in result.mappings().all()
+    ]
+
+
 @router.get("/active")
 async def get_active_game(
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = (
-        select(Game)
-        .where(Game.status.in_(["lobby", "playing"]))
-        .where(Game.expires_at > func.now())
-        .order_by(Game.created_at.desc())
-        .limit(1)
-    )
-    result = await db.execute(stmt)
-    game = result.scalar_one_or_none()
+    game = await resolve_active_game(db)
     if not game:
         return {"game": None}
 
@@ -40,11 +139,11 @@ async def get_active_game(
     }
 
 
-@router.get("/{game_id}/eyeballs")
+@router.get("/{game_id}/eyeballs", response_model=GameEyeballsResponse)
 async def get_game_eyeballs(
     game_id: str,
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(
@@ -53,22 +152,22 @@ async def get_game_eyeballs(
             Eyeball.type_id,
             Eyeball.point,
             Eyeball.is_active,
-            EyeballType.name.label("type_name"),
         )
-        .join(EyeballType, EyeballType.id == Eyeball.type_id)
         .where(Eyeball.game_id == game_id)
         .order_by(Eyeball.created_at.asc())
     )
     result = await db.execute(stmt)
+    rows = result.mappings().all()
+    type_names = await eyeball_type_names(db, {row["type_id"] for row in rows})
     eyeballs = []
-    for row in result.mappings().all():
+    for row in rows:
         points = row["point"]
         eyeballs.append(
             {
                 "id": row["id"],
                 "qr_code": row["qr_code"],
                 "is_active": row["is_active"],
-                "type_name": row["type_name"],
+                "type_name": type_names.get(row["type_id"]),
                 "type_id": row["type_id"],
                 "points": points,
             }
@@ -77,107 +176,79 @@ async def get_game_eyeballs(
     return {"game_id": game_id, "eyeballs": eyeballs}
 
 
-@router.get("/{game_id}/leaderboard")
+@router.get(
+    "/{game_id}/leaderboard",
+    response_model=GameLeaderboardResponse,
+    dependencies=[query_budget(2)],
+)
 async def game_leaderboard(
     game_id: str,
+    request: Request,
+    response: Response,
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    stmt = text(
-        """
-        SELECT g.id AS group_id,
-               g.name,
-               g.code,
-               COALESCE(SUM(gs.score), 0) AS total_score,
-               COALESCE(SUM(gs.captures_count), 0) AS captures_count,
-               MAX(gs.updated_at) AS updated_at
-        FROM public.groups g
-        LEFT JOIN public.group_scores gs ON gs.group_id = g.id
-        WHERE g.game_id = :game_id
-        GROUP BY g.id, g.name, g.code
-        ORDER BY total_score DESC, MAX(gs.updated_at) ASC NULLS LAST
-        """
-    )
-    result = await db.execute(stmt, {"game_id": game_id})
-    leaderboard = [
-        {
-            "group_id": row["group_id"],
-            "name": row["name"],
-            "code": row["code"],
-            "score": row["total_score"],
-            "captures_count": row["captures_count"],
-            "updated_at": row["updated_at"],
-        }
-        for row in result.mappings().all()
-    ]
+    etag = make_etag("leaderboard", game_id, await get_game_version(db, game_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
+    leaderboard = await _fetch_group_leaderboard(db, game_id)
+    set_etag(response, etag)
     return {"game_id": game_id, "leaderboard": leaderboard}
 
 
-@router.get("/{game_id}/result")
-async def game_result(
+@router.get("/{game_id}/leaderboard/stream")
+async def game_leaderboard_stream(
     game_id: str,
+    request: Request,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    group_stmt = text(
-        """
-        SELECT g.id AS group_id,
-               g.name,
-               g.code,
-               COALESCE(SUM(gs.score), 0) AS total_score,
-               COALESCE(SUM(gs.captures_count), 0) AS captures_count,
-               MAX(gs.updated_at) AS updated_at
-        FROM public.groups g
-        LEFT JOIN public.group_scores gs ON gs.group_id = g.id
-        WHERE g.game_id = :game_id
-        GROUP BY g.id, g.name, g.code
-        ORDER BY total_score DESC, MAX(gs.updated_at) ASC NULLS LAST
-        """
+    # Bearer auth like every other route: browsers' EventSource can't set headers, so
+    # the frontend reads this with fetch (Frontend/src/lib/leaderboardStream.js).
+    # Subscribe before reading the snapshot so deltas committed meanwhile are
+    # buffered rather than lost. Deltas come from the primary, so the snapshot
+    # does too; a lagging replica could be older than the first delta.
+    stack = AsyncExitStack()
+    subscription = await stack.enter_async_context(subscribe_leaderboard(game_id))
+    try:
+        leaderboard = await _fetch_group_leaderboard(db, game_id)
+    except BaseException:
+        await stack.aclose()
+        raise
+    # Return the pooled connection now; the stream itself never touches the DB.
+    await db.close()
+
+    return StreamingResponse(
+        _leaderboard_events(request, game_id, leaderboard, subscription, stack),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    group_result = await db.execute(group_stmt, {"game_id": game_id})
-    group_leaderboard = [
-        {
-            "group_id": row["group_id"],
-            "name": row["name"],
-            "code": row["code"],
-            "score": row["total_score"],
-            "captures_count": row["captures_count"],
-            "updated_at": row["updated_at"],
-        }
-        for row in group_result.mappings().all()
-    ]
 
-    personal_stmt = text(
-        """
-        SELECT gm.user_id,
-               COALESCE(ps.score, 0) AS score,
-               COALESCE(ps.captures_count, 0) AS captures_count,
-               ps.updated_at,
-               u.nickname,
-               u.avatar_url
-        FROM public.group_members gm
-        JOIN public.groups g ON g.id = gm.group_id
-        JOIN public.users u ON u.id = gm.user_id
-        LEFT JOIN public.personal_scores ps
-               ON ps.game_id = :game_id AND ps.user_id = gm.user_id
-        WHERE g.game_id = :game_id
-        ORDER BY score DESC, ps.updated_at ASC NULLS LAST
-        """
+
+@router.get(
+    "/{game_id}/result",
+    response_model=GameResultResponse,
+    dependencies=[query_budget(3)],
+)
+async def game_result(
+    game_id: str,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    etag = make_etag("result", game_id, await get_game_version(db, game_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    group_leaderboard, personal_leaderboard = await run_concurrently(
+        db,
+        lambda session: _fetch_group_leaderboard(session, game_id),
+        lambda session: _fetch_personal_leaderboard(session, game_id),
     )
-    personal_result = await db.execute(personal_stmt, {"game_id": game_id})
-    personal_leaderboard = [
-        {
-            "user_id": row["user_id"],
-            "score": row["score"],
-            "captures_count": row["captures_count"],
-            "nickname": row["nickname"],
-            "avatar_url": row["avatar_url"],
-            "updated_at": row["updated_at"],
-        }
-        for row in personal_result.mappings().all()
-    ]
 
+    set_etag(response, etag)
     return {
         "game_id": game_id,
         "group_leaderboard": group_leaderboard,
@@ -185,11 +256,13 @@ async def game_result(
     }
 
 
-@router.get("/{game_id}/captures")
+@router.get("/{game_id}/captures", response_model=GameCapturesResponse)
 async def game_captures(
     game_id: str,
+    cursor: str | None = None,
+    limit: int = Query(default=CAPTURE_PAGE_DEFAULT, ge=1, le=CAPTURE_PAGE_MAX),
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(
@@ -199,20 +272,19 @@ async def game_captures(
             Capture.user_id,
             Capture.image_url,
             Eyeball.qr_code,
-            EyeballType.name.label("type_name"),
             Eyeball.type_id,
             Eyeball.point,
             UserProfile.nickname,
         )
         .join(Eyeball, Eyeball.id == Capture.eyeball_id)
-        .join(EyeballType, EyeballType.id == Eyeball.type_id)
         .join(UserProfile, UserProfile.id == Capture.user_id)
         .where(Capture.game_id == game_id)
-        .order_by(Capture.captured_at.desc())
     )
-    result = await db.execute(stmt)
+    result = await db.execute(paginate_captures(stmt, cursor, limit))
+    rows, next_cursor = split_capture_page(result.mappings().all(), limit)
+    type_names = await eyeball_type_names(db, {row["type_id"] for row in rows})
     captures = []
-    for row in result.mappings().all():
+    for row in rows:
         points = row["point"]
         captures.append(
             {
@@ -223,10 +295,10 @@ async def game_captures(
                 "nickname": row["nickname"],
                 "image_url": row["image_url"],
                 "qr_code": row["qr_code"],
-                "type_name": row["type_name"],
+                "type_name": type_names.get(row["type_id"]),
                 "type_id": row["type_id"],
                 "points": points,
             }
         )
 
-    return {"game_id": game_id, "captures": captures}
+    return {"game_id": game_id, "captures": captures, "next_cursor": next_cursor}
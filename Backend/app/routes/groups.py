@@ -1,41 +1,97 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select, text
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.active_game import resolve_active_game_id
+from app.core.db import get_db, get_read_db, pin_primary, run_concurrently
+from app.core.eyeball_types import eyeball_type_names
+from app.core.metrics import query_budget
+from app.core.pagination import (
+    CAPTURE_PAGE_DEFAULT,
+    CAPTURE_PAGE_MAX,
+    paginate_captures,
+    split_capture_page,
+)
 from app.core.security import CurrentUser, get_current_user
-from app.models import Game, Group, GroupMember, GroupScore, UserProfile
-from app.schemas import GroupCreateRequest, GroupJoinRequest
+from app.core.versions import (
+    etag_matches,
+    get_group_game_version,
+    make_etag,
+    not_modified,
+    set_etag,
+)
+from app.models import (
+    Capture,
+    Eyeball,
+    Game,
+    Group,
+    GroupMember,
+    GroupScore,
+    UserProfile,
+)
+from app.schemas import (
+    GroupCapturesResponse,
+    GroupCreateRequest,
+    GroupJoinRequest,
+    GroupLeaderboardResponse,
+    GroupSnapshotResponse,
+)
 from app.utils import generate_group_code
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 logger = logging.getLogger(__name__)
 
 
-async def get_group_member_count(db: AsyncSession, group_id: str) -> int:
-    stmt = select(func.count()).select_from(GroupMember).where(GroupMember.group_id == group_id)
-    result = await db.execute(stmt)
-    return result.scalar_one()
+GROUP_CODE_ATTEMPTS = 5
+
+# Creates the group with its owner membership, score rows and version bump in one
+# statement. A taken code inserts nothing (ON CONFLICT DO NOTHING) and returns no
+# row, so the caller retries with a fresh code; the unique index arbitrates races.
+_CREATE_GROUP_STMT = text(
+    """
+    WITH new_group AS (
+        INSERT INTO public.groups (id, game_id, code, name, owner_id, max_members)
+        VALUES (
+            gen_random_uuid(),
+            CAST(:game_id AS uuid),
+            :code,
+            :name,
+            CAST(:owner_id AS uuid),
+            :max_members
+        )
+        ON CONFLICT (code) DO NOTHING
+        RETURNING id, game_id, code, name, owner_id, max_members, created_at
+    ),
+    owner_member AS (
+        INSERT INTO public.group_members (group_id, user_id, role)
+        SELECT id, owner_id, 'owner' FROM new_group
+    ),
+    owner_score AS (
+        INSERT INTO public.group_scores (group_id, user_id)
+        SELECT id, owner_id FROM new_group
+    ),
+    game_version AS (
+        INSERT INTO public.game_versions (game_id, version)
+        SELECT game_id, 1 FROM new_group
+        ON CONFLICT (game_id)
+        DO UPDATE SET version = public.game_versions.version + 1
+    )
+    SELECT id, game_id, code, name, owner_id, max_members, created_at FROM new_group
+    """
+)
 
 
-@router.post("")
+@router.post("", dependencies=[query_budget(2)])
 async def create_group(
     payload: GroupCreateRequest,
+    response: Response,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
     if not payload.game_id:
-        active_stmt = (
-            select(Game.id)
-            .where(Game.status.in_(["lobby", "playing"]))
-            .where(Game.expires_at > func.now())
-            .order_by(Game.created_at.desc())
-            .limit(1)
-        )
-        result = await db.execute(active_stmt)
-        game_id = result.scalar_one_or_none()
+        game_id = await resolve_active_game_id(db)
         if not game_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -44,45 +100,37 @@ async def create_group(
     else:
         game_id = payload.game_id
 
+    # A requested code that is taken falls back to generated ones.
     code = payload.code or generate_group_code()
-    for _ in range(5):
-        existing_stmt = select(Group).where(Group.code == code)
-        existing = await db.execute(existing_stmt)
-        if not existing.scalar_one_or_none():
+    for _ in range(GROUP_CODE_ATTEMPTS):
+        result = await db.execute(
+            _CREATE_GROUP_STMT,
+            {
+                "game_id": str(game_id),
+                "code": code,
+                "name": payload.name,
+                "owner_id": current_user.user_id,
+                "max_members": payload.max_members or 6,
+            },
+        )
+        group = result.mappings().one_or_none()
+        if group:
             break
         code = generate_group_code()
     else:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Unable to allocate group code")
 
-    group = Group(
-        game_id=game_id,
-        code=code,
-        name=payload.name,
-        owner_id=current_user.user_id,
-        max_members=payload.max_members or 6,
-    )
-    db.add(group)
-    await db.flush()
-
-    db.add(
-        GroupMember(
-            group_id=group.id,
-            user_id=current_user.user_id,
-            role="owner",
-        )
-    )
-    db.add(GroupScore(group_id=group.id, user_id=current_user.user_id))
-
     await db.commit()
+    pin_primary(current_user.user_id, response)
 
     return {
-        "id": group.id,
-        "game_id": group.game_id,
-        "code": group.code,
-        "name": group.name,
-        "owner_id": group.owner_id,
-        "max_members": group.max_members,
-        "created_at": group.created_at,
+        "id": group["id"],
+        "game_id": group["game_id"],
+        "code": group["code"],
+        "name": group["name"],
+        "owner_id": group["owner_id"],
+        "max_members": group["max_members"],
+        "created_at": group["created_at"],
     }
 
 
@@ -91,15 +139,7 @@ async def list_active_groups(
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    active_stmt = (
-        select(Game.id)
-        .where(Game.status.in_(["lobby", "playing"]))
-        .where(Game.expires_at > func.now())
-        .order_by(Game.created_at.desc())
-        .limit(1)
-    )
-    result = await db.execute(active_stmt)
-    game_id = result.scalar_one_or_none()
+    game_id = await resolve_active_game_id(db)
     if not game_id:
         # Fall back to the latest game with groups so onboarding can still show choices.
         fallback_stmt = (
@@ -124,14 +164,12 @@ async def list_active_groups(
                g.code,
                g.name,
                g.max_members,
-               COALESCE(SUM(gs.score), 0) AS total_score,
-               COALESCE(SUM(gs.captures_count), 0) AS captures_count,
-               COALESCE(COUNT(DISTINCT gm.user_id), 0) AS member_count
+               COALESCE(gt.total_score, 0) AS total_score,
+               COALESCE(gt.captures_count, 0) AS captures_count,
+               g.member_count
         FROM public.groups g
-        LEFT JOIN public.group_scores gs ON gs.group_id = g.id
-        LEFT JOIN public.group_members gm ON gm.group_id = g.id
+        LEFT JOIN public.group_totals gt ON gt.group_id = g.id
         WHERE g.game_id = :game_id
-        GROUP BY g.id
         ORDER BY g.created_at ASC
         """
     )
@@ -154,46 +192,85 @@ async def list_active_groups(
     return {"game_id": game_id, "groups": groups}
 
 
-@router.post("/join")
+# Joins in one statement. FOR NO KEY UPDATE queues concurrent joins to the same
+# group and hands each the member_count left by the previous one (kept by a
+# trigger on group_members), so the capacity check cannot be raced past
+# max_members. It does not conflict with the KEY SHARE lock captures take through
+# their foreign key, so captures neither wait on joins nor deadlock with them.
+_JOIN_GROUP_STMT = text(
+    """
+    WITH target AS (
+        SELECT id, game_id, code, name, owner_id, max_members, member_count, created_at
+        FROM public.groups
+        WHERE code = :code
+        FOR NO KEY UPDATE
+    ),
+    new_member AS (
+        INSERT INTO public.group_members (group_id, user_id)
+        SELECT id, CAST(:user_id AS uuid) FROM target
+        WHERE member_count < max_members
+        ON CONFLICT (group_id, user_id) DO NOTHING
+        RETURNING group_id
+    ),
+    member_score AS (
+        INSERT INTO public.group_scores (group_id, user_id)
+        SELECT group_id, CAST(:user_id AS uuid) FROM new_member
+        ON CONFLICT (group_id, user_id) DO NOTHING
+    ),
+    game_version AS (
+        INSERT INTO public.game_versions (game_id, version)
+        SELECT target.game_id, 1 FROM target JOIN new_member ON new_member.group_id = target.id
+        ON CONFLICT (game_id)
+        DO UPDATE SET version = public.game_versions.version + 1
+    )
+    SELECT target.*,
+           EXISTS (SELECT 1 FROM new_member) AS joined,
+           EXISTS (
+               SELECT 1 FROM public.group_members gm
+               WHERE gm.group_id = target.id AND gm.user_id = CAST(:user_id AS uuid)
+           ) AS already_member
+    FROM target
+    """
+)
+
+
+@router.post("/join", dependencies=[query_budget(1)])
 async def join_group(
     payload: GroupJoinRequest,
+    response: Response,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(Group).where(Group.code == payload.code)
-    result = await db.execute(stmt)
-    group = result.scalar_one_or_none()
+    result = await db.execute(
+        _JOIN_GROUP_STMT,
+        {"code": payload.code, "user_id": current_user.user_id},
+    )
+    group = result.mappings().one_or_none()
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
-    member_count = await get_group_member_count(db, group.id)
-    if member_count >= group.max_members:
+    if not group["joined"]:
+        # A free seat that still inserted nothing means a concurrent join by the
+        # same user won the ON CONFLICT.
+        if group["already_member"] or group["member_count"] < group["max_members"]:
+            return {"id": group["id"], "message": "Already joined"}
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Group is full")
 
-    exists_stmt = select(GroupMember).where(
-        GroupMember.group_id == group.id,
-        GroupMember.user_id == current_user.user_id,
-    )
-    exists = await db.execute(exists_stmt)
-    if exists.scalar_one_or_none():
-        return {"id": group.id, "message": "Already joined"}
-
-    db.add(GroupMember(group_id=group.id, user_id=current_user.user_id))
-    db.add(GroupScore(group_id=group.id, user_id=current_user.user_id))
     await db.commit()
+    pin_primary(current_user.user_id, response)
 
     return {
-        "id": group.id,
-        "game_id": group.game_id,
-        "code": group.code,
-        "name": group.name,
-        "owner_id": group.owner_id,
-        "max_members": group.max_members,
-        "created_at": group.created_at,
+        "id": group["id"],
+        "game_id": group["game_id"],
+        "code": group["code"],
+        "name": group["name"],
+        "owner_id": group["owner_id"],
+        "max_members": group["max_members"],
+        "created_at": group["created_at"],
     }
 
 
-@router.get("/me")
+@router.get("/me", dependencies=[query_budget(1)])
 async def get_my_group(
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
@@ -221,13 +298,8 @@ async def get_my_group(
     }
 
 
-@router.get("/{group_id}/snapshot")
-async def group_snapshot(
-    group_id: str,
-    current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    member_stmt = (
+async def _fetch_group_members(db: AsyncSession, group_id: str) -> list[dict]:
+    stmt = (
         select(
             GroupMember.user_id,
             GroupMember.role,
@@ -239,8 +311,8 @@ async def group_snapshot(
         .where(GroupMember.group_id == group_id)
         .order_by(GroupMember.joined_at.asc())
     )
-    members_result = await db.execute(member_stmt)
-    members = [
+    result = await db.execute(stmt)
+    return [
         {
             "user_id": row["user_id"],
             "role": row["role"],
@@ -248,26 +320,52 @@ async def group_snapshot(
             "nickname": row["nickname"],
             "avatar_url": row["avatar_url"],
         }
-        for row in members_result.mappings().all()
+        for row in result.mappings().all()
     ]
 
-    score_stmt = text(
+
+async def _fetch_group_totals(db: AsyncSession, group_id: str) -> dict:
+    stmt = text(
         """
-        SELECT COALESCE(SUM(score), 0) AS total_score,
-               COALESCE(SUM(captures_count), 0) AS captures_count
-        FROM public.group_scores
+        SELECT COALESCE(MAX(total_score), 0) AS total_score,
+               COALESCE(MAX(captures_count), 0) AS captures_count
+        FROM public.group_totals
         WHERE group_id = :group_id
         """
     )
-    score_result = await db.execute(score_stmt, {"group_id": group_id})
-    score_row = score_result.mappings().one()
+    result = await db.execute(stmt, {"group_id": group_id})
+    return dict(result.mappings().one())
 
-    group_stmt = select(Group).where(Group.id == group_id)
-    group_result = await db.execute(group_stmt)
-    group = group_result.scalar_one_or_none()
+
+@router.get(
+    "/{group_id}/snapshot",
+    response_model=GroupSnapshotResponse,
+    dependencies=[query_budget(4)],
+)
+async def group_snapshot(
+    group_id: str,
+    request: Request,
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    version = await get_group_game_version(db, group_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    etag = make_etag("group-snapshot", group_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    members, totals, group = await run_concurrently(
+        db,
+        lambda session: _fetch_group_members(session, group_id),
+        lambda session: _fetch_group_totals(session, group_id),
+        lambda session: session.scalar(select(Group).where(Group.id == group_id)),
+    )
     if not group:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
+    set_etag(response, etag)
     return {
         "group": {
             "id": group.id,
@@ -279,17 +377,30 @@ async def group_snapshot(
             "created_at": group.created_at,
         },
         "members": members,
-        "total_score": score_row["total_score"],
-        "captures_count": score_row["captures_count"],
+        "total_score": totals["total_score"],
+        "captures_count": totals["captures_count"],
     }
 
 
-@router.get("/{group_id}/leaderboard")
+@router.get(
+    "/{group_id}/leaderboard",
+    response_model=GroupLeaderboardResponse,
+    dependencies=[query_budget(2)],
+)
 async def group_leaderboard(
     group_id: str,
+    request: Request,
+    response: Response,
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    version = await get_group_game_version(db, group_id)
+    etag = None
+    if version is not None:
+        etag = make_etag("group-leaderboard", group_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
     stmt = (
         select(
             GroupScore.user_id,
@@ -316,4 +427,52 @@ async def group_leaderboard(
         for row in result.mappings().all()
     ]
 
+    if etag:
+        set_etag(response, etag)
     return {"group_id": group_id, "leaderboard": leaderboard}
+
+
+@router.get("/{group_id}/captures", response_model=GroupCapturesResponse)
+async def group_captures(
+    group_id: str,
+    cursor: str | None = None,
+    limit: int = Query(default=CAPTURE_PAGE_DEFAULT, ge=1, le=CAPTURE_PAGE_MAX),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = (
+        select(
+            Capture.id.label("capture_id"),
+            Capture.captured_at,
+            Capture.game_id,
+            Capture.user_id,
+            Capture.image_url,
+            Eyeball.qr_code,
+            Eyeball.type_id,
+            Eyeball.point,
+            UserProfile.nickname,
+        )
+        .join(Eyeball, Eyeball.id == Capture.eyeball_id)
+        .join(UserProfile, UserProfile.id == Capture.user_id)
+        .where(Capture.group_id == group_id)
+    )
+    result = await db.execute(paginate_captures(stmt, cursor, limit))
+    rows, next_cursor = split_capture_page(result.mappings().all(), limit)
+    type_names = await eyeball_type_names(db, {row["type_id"] for row in rows})
+    captures = [
+        {
+            "id": row["capture_id"],
+            "captured_at": row["captured_at"],
+            "game_id": row["game_id"],
+            "user_id": row["user_id"],
+            "nickname": row["nickname"],
+            "image_url": row["image_url"],
+            "qr_code": row["qr_code"],
+            "type_name": type_names.get(row["type_id"]),
+            "type_id": row["type_id"],
+            "points": row["point"],
+        }
+        for row in rows
+    ]
+
+    return {"group_id": group_id, "captures": captures, "next_cursor": next_cursor}
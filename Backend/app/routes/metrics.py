@@ -0,0 +1,23 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import get_settings
+from app.core.db import engine, replica_engine
+from app.core.metrics import render_metrics
+
+router = APIRouter(tags=["system"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: str | None = Header(default=None)):
+    token = get_settings().metrics_token
+    if token and not secrets.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    engines = {"primary": engine}
+    if replica_engine is not engine:
+        engines["replica"] = replica_engine
+    return PlainTextResponse(render_metrics(engines), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,28 +1,22 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy import func, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.active_game import resolve_active_game_id
+from app.core.db import get_read_db
+from app.core.metrics import query_budget
 from app.core.security import CurrentUser, get_current_user
-from app.models import Game, Group, GroupMember, GroupScore, PersonalScore
+from app.models import Group, GroupMember, GroupTotal, PersonalScore
 
 router = APIRouter(prefix="/score", tags=["scores"])
 
 
-@router.get("/me")
+@router.get("/me", dependencies=[query_budget(2)])
 async def get_my_score(
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    game_stmt = (
-        select(Game.id)
-        .where(Game.status.in_(["lobby", "playing"]))
-        .where(Game.expires_at > func.now())
-        .order_by(Game.created_at.desc())
-        .limit(1)
-    )
-    game_result = await db.execute(game_stmt)
-    game_id = game_result.scalar_one_or_none()
+    game_id = await resolve_active_game_id(db)
     if not game_id:
         return {"game_id": None, "score": 0, "captures_count": 0}
 
@@ -44,20 +38,12 @@ async def get_my_score(
     }
 
 
-@router.get("/summary")
+@router.get("/summary", dependencies=[query_budget(4)])
 async def get_score_summary(
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    game_stmt = (
-        select(Game.id)
-        .where(Game.status.in_(["lobby", "playing"]))
-        .where(Game.expires_at > func.now())
-        .order_by(Game.created_at.desc())
-        .limit(1)
-    )
-    game_result = await db.execute(game_stmt)
-    game_id = game_result.scalar_one_or_none()
+    game_id = await resolve_active_game_id(db)
     if not game_id:
         return {
             "game_id": None,
@@ -99,21 +85,15 @@ async def get_score_summary(
             "team_captures": 0,
         }
 
-    team_stmt = (
-        select(
-            func.coalesce(func.sum(GroupScore.score), 0).label("team_score"),
-            func.coalesce(func.sum(GroupScore.captures_count), 0).label("team_captures"),
-        )
-        .where(GroupScore.group_id == group_id)
-    )
+    team_stmt = select(GroupTotal).where(GroupTotal.group_id == group_id)
     team_result = await db.execute(team_stmt)
-    team_row = team_result.mappings().one()
+    team = team_result.scalar_one_or_none()
 
     return {
         "game_id": game_id,
         "group_id": group_id,
         "personal_score": personal_score,
         "personal_captures": personal_captures,
-        "team_score": team_row["team_score"],
-        "team_captures": team_row["team_captures"],
+        "team_score": team.total_score if team else 0,
+        "team_captures": team.captures_count if team else 0,
     }
@@ -1,11 +1,10 @@
 import logging
 import time
 
-import httpx
-
 from fastapi import APIRouter, HTTPException, status
 
 from app.core.config import get_settings
+from app.core.http import get_http_client
 
 router = APIRouter(prefix="/system", tags=["system"])
 logger = logging.getLogger(__name__)
@@ -50,8 +49,7 @@ async def naver_map_validate(url: str):
         "time": int(time.time() * 1000),
     }
     validate_url = "https://oapi.map.naver.com/v1/validatev3"
-    async with httpx.AsyncClient(timeout=5) as client:
-        resp = await client.get(validate_url, params=params)
+    resp = await get_http_client().get(validate_url, params=params, timeout=5)
     if resp.status_code >= 400:
         logger.error("naver_map validate error %s: %s", resp.status_code, resp.text)
         raise HTTPException(
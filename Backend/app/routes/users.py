@@ -1,11 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select, update
+from dataclasses import asdict
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.active_game import resolve_active_game
+from app.core.db import get_db, get_read_db, pin_primary
+from app.core.eyeball_types import count_by_type_name, eyeball_type_names, get_eyeball_types
+from app.core.metrics import query_budget
+from app.core.pagination import (
+    CAPTURE_PAGE_DEFAULT,
+    CAPTURE_PAGE_MAX,
+    paginate_captures,
+    split_capture_page,
+)
 from app.core.security import CurrentUser, get_current_user
-from app.models import Capture, Eyeball, EyeballType, Game, UserProfile
-from app.schemas import ProfileUpdateRequest
+from app.core.versions import bump_user_game_versions
+from app.models import Capture, Eyeball, Game, UserProfile
+from app.schemas import MyCapturesResponse, MyStateResponse, ProfileUpdateRequest
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -33,6 +47,7 @@ async def get_me(
 @router.patch("/me")
 async def update_me(
     payload: ProfileUpdateRequest,
+    response: Response,
     current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
@@ -56,7 +71,10 @@ async def update_me(
     if not profile:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
 
+    # Nicknames and avatars show up in group views and leaderboards.
+    await bump_user_game_versions(db, current_user.user_id)
     await db.commit()
+    pin_primary(current_user.user_id, response)
     return {
         "id": str(profile.id),
         "nickname": profile.nickname,
@@ -66,10 +84,12 @@ async def update_me(
     }
 
 
-@router.get("/me/captures")
+@router.get("/me/captures", response_model=MyCapturesResponse)
 async def get_my_captures(
+    cursor: str | None = None,
+    limit: int = Query(default=CAPTURE_PAGE_DEFAULT, ge=1, le=CAPTURE_PAGE_MAX),
     current_user: CurrentUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     stmt = (
         select(
@@ -80,19 +100,17 @@ async def get_my_captures(
             Capture.eyeball_id,
             Capture.image_url,
             Eyeball.qr_code,
-            EyeballType.name.label("type_name"),
             Eyeball.type_id,
             Eyeball.point,
             Game.title.label("game_title"),
         )
         .join(Eyeball, Eyeball.id == Capture.eyeball_id)
-        .join(EyeballType, EyeballType.id == Eyeball.type_id)
         .join(Game, Game.id == Capture.game_id)
         .where(Capture.user_id == current_user.user_id)
-        .order_by(Capture.captured_at.desc())
     )
-    result = await db.execute(stmt)
-    rows = result.mappings().all()
+    result = await db.execute(paginate_captures(stmt, cursor, limit))
+    rows, next_cursor = split_capture_page(result.mappings().all(), limit)
+    type_names = await eyeball_type_names(db, {row["type_id"] for row in rows})
     captures = []
     for row in rows:
         points = row["point"]
@@ -106,10 +124,103 @@ async def get_my_captures(
                 "eyeball_id": row["eyeball_id"],
                 "image_url": row["image_url"],
                 "qr_code": row["qr_code"],
-                "type_name": row["type_name"],
+                "type_name": type_names.get(row["type_id"]),
                 "type_id": row["type_id"],
                 "points": points,
             }
         )
 
-    return {"captures": captures}
+    return {"captures": captures, "next_cursor": next_cursor}
+
+
+# Everything the in-game screens poll, in one round trip once the active game is
+# known: the player's group in that game, both scores and the map counters.
+_STATE_STMT = text(
+    """
+    WITH membership AS (
+        SELECT g.id, g.game_id, g.code, g.name, g.owner_id, g.max_members, g.created_at
+        FROM public.group_members gm
+        JOIN public.groups g ON g.id = gm.group_id
+        WHERE gm.user_id = CAST(:user_id AS uuid)
+          AND g.game_id = CAST(:game_id AS uuid)
+        ORDER BY g.created_at DESC
+        LIMIT 1
+    )
+    SELECT m.id AS group_id,
+           m.game_id AS group_game_id,
+           m.code,
+           m.name,
+           m.owner_id,
+           m.max_members,
+           m.created_at,
+           COALESCE(ps.score, 0) AS personal_score,
+           COALESCE(ps.captures_count, 0) AS personal_captures,
+           COALESCE(gt.total_score, 0) AS team_score,
+           COALESCE(gt.captures_count, 0) AS team_captures,
+           COALESCE(
+               (SELECT jsonb_agg(jsonb_build_array(c.type_id, c.active_count))
+                FROM public.eyeball_active_counts c
+                WHERE c.game_id = CAST(:game_id AS uuid)),
+               '[]'::jsonb
+           ) AS active_counts
+    FROM (SELECT 1) AS one
+    LEFT JOIN membership m ON true
+    LEFT JOIN public.personal_scores ps
+      ON ps.game_id = CAST(:game_id AS uuid) AND ps.user_id = CAST(:user_id AS uuid)
+    LEFT JOIN public.group_totals gt ON gt.group_id = m.id
+    """
+).columns(active_counts=JSONB)
+
+
+@router.get("/me/state", response_model=MyStateResponse, dependencies=[query_budget(3)])
+async def get_my_state(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    game = await resolve_active_game(db)
+    if not game:
+        return {
+            "game": None,
+            "group": None,
+            "score": {
+                "game_id": None,
+                "group_id": None,
+                "personal_score": 0,
+                "personal_captures": 0,
+                "team_score": 0,
+                "team_captures": 0,
+            },
+            "active_counts": {},
+        }
+
+    result = await db.execute(_STATE_STMT, {"game_id": game.id, "user_id": current_user.user_id})
+    row = result.mappings().one()
+
+    active_counts = [(UUID(type_id), count) for type_id, count in row["active_counts"]]
+    types = await get_eyeball_types(db, [type_id for type_id, _ in active_counts])
+
+    group = None
+    if row["group_id"]:
+        group = {
+            "id": row["group_id"],
+            "game_id": row["group_game_id"],
+            "code": row["code"],
+            "name": row["name"],
+            "owner_id": row["owner_id"],
+            "max_members": row["max_members"],
+            "created_at": row["created_at"],
+        }
+
+    return {
+        "game": asdict(game),
+        "group": group,
+        "score": {
+            "game_id": game.id,
+            "group_id": row["group_id"],
+            "personal_score": row["personal_score"],
+            "personal_captures": row["personal_captures"],
+            "team_score": row["team_score"],
+            "team_captures": row["team_captures"],
+        },
+        "active_counts": count_by_type_name(types, active_counts),
+    }
@@ -1,3 +1,6 @@
+from datetime import datetime
+from uuid import UUID
+
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 
@@ -54,7 +57,165 @@ class CaptureCreateRequest(BaseModel):
 
 class EyeballBulkCreateRequest(BaseModel):
     game_id: str | None = None
-    per_type_count: int = Field(default=2, ge=1, le=10)
+    per_type_count: int = Field(default=2, ge=1, le=50000)
     point: int = 0
     is_active: bool = True
 
+
+# Response models. Declaring them lets FastAPI serialize straight to JSON bytes
+# through pydantic-core instead of jsonable_encoder + json.dumps (see bench/serialization.py).
+class GameEyeball(BaseModel):
+    id: UUID
+    qr_code: str
+    is_active: bool
+    type_name: str
+    type_id: UUID
+    points: int
+
+
+class GameEyeballsResponse(BaseModel):
+    game_id: str
+    eyeballs: list[GameEyeball]
+
+
+class GroupStanding(BaseModel):
+    group_id: UUID
+    name: str | None
+    code: str
+    score: int
+    captures_count: int
+    updated_at: datetime
+
+
+class PlayerStanding(BaseModel):
+    user_id: UUID
+    score: int
+    captures_count: int
+    nickname: str
+    avatar_url: str | None
+    updated_at: datetime | None
+
+
+class GameLeaderboardResponse(BaseModel):
+    game_id: str
+    leaderboard: list[GroupStanding]
+
+
+class GameResultResponse(BaseModel):
+    game_id: str
+    group_leaderboard: list[GroupStanding]
+    personal_leaderboard: list[PlayerStanding]
+
+
+class GameCapture(BaseModel):
+    id: UUID
+    captured_at: datetime
+    group_id: UUID
+    user_id: UUID
+    nickname: str
+    image_url: str | None
+    qr_code: str
+    type_name: str
+    type_id: UUID
+    points: int
+
+
+class GameCapturesResponse(BaseModel):
+    game_id: str
+    captures: list[GameCapture]
+    next_cursor: str | None
+
+
+class MyCapture(BaseModel):
+    id: UUID
+    captured_at: datetime
+    game_id: UUID
+    game_title: str | None
+    group_id: UUID
+    eyeball_id: UUID
+    image_url: str | None
+    qr_code: str
+    type_name: str
+    type_id: UUID
+    points: int
+
+
+class MyCapturesResponse(BaseModel):
+    captures: list[MyCapture]
+    next_cursor: str | None
+
+
+class GroupCapture(BaseModel):
+    id: UUID
+    captured_at: datetime
+    game_id: UUID
+    user_id: UUID
+    nickname: str
+    image_url: str | None
+    qr_code: str
+    type_name: str
+    type_id: UUID
+    points: int
+
+
+class GroupCapturesResponse(BaseModel):
+    group_id: str
+    captures: list[GroupCapture]
+    next_cursor: str | None
+
+
+class GroupLeaderboardResponse(BaseModel):
+    group_id: str
+    leaderboard: list[PlayerStanding]
+
+
+class GroupInfo(BaseModel):
+    id: UUID
+    game_id: UUID
+    code: str
+    name: str | None
+    owner_id: UUID | None
+    max_members: int
+    created_at: datetime
+
+
+class GroupMemberInfo(BaseModel):
+    user_id: UUID
+    role: str
+    joined_at: datetime
+    nickname: str
+    avatar_url: str | None
+
+
+class GroupSnapshotResponse(BaseModel):
+    group: GroupInfo
+    members: list[GroupMemberInfo]
+    total_score: int
+    captures_count: int
+
+
+class ActiveGameInfo(BaseModel):
+    id: UUID
+    title: str | None
+    status: str
+    owner_id: UUID | None
+    created_at: datetime
+    starts_at: datetime | None
+    ends_at: datetime | None
+    expires_at: datetime
+
+
+class ScoreSummary(BaseModel):
+    game_id: UUID | None
+    group_id: UUID | None
+    personal_score: int
+    personal_captures: int
+    team_score: int
+    team_captures: int
+
+
+class MyStateResponse(BaseModel):
+    game: ActiveGameInfo | None
+    group: GroupInfo | None
+    score: ScoreSummary
+    active_counts: dict[str, int]
@@ -1,7 +1,7 @@
-import random
+import secrets
 import string
 
 
 def generate_group_code(length: int = 6) -> str:
     alphabet = string.ascii_uppercase + string.digits
-    return "".join(random.choice(alphabet) for _ in range(length))
+    return "".join(secrets.choice(alphabet) for _ in range(length))
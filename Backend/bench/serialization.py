@@ -0,0 +1,136 @@
+"""Compare JSON encode time per 1k rows for the list endpoints' payloads.
+
+"before" is FastAPI's path for handlers without a response model
+(jsonable_encoder + JSONResponse.render); "after" is the path taken once a
+response model is declared (pydantic validate + dump_json straight to bytes).
+
+    python -m bench.serialization --rows 1000 --repeat 50
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import time
+from uuid import uuid4
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas import GameCapturesResponse, GameEyeballsResponse, GameResultResponse
+
+
+def _render_default(content) -> bytes:
+    # starlette.responses.JSONResponse.render
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def captures_payload(rows: int) -> dict:
+    now = datetime.now(timezone.utc)
+    group_ids = [uuid4() for _ in range(20)]
+    return {
+        "game_id": str(uuid4()),
+        "captures": [
+            {
+                "id": uuid4(),
+                "captured_at": now - timedelta(seconds=index),
+                "group_id": group_ids[index % len(group_ids)],
+                "user_id": uuid4(),
+                "nickname": f"player{index}",
+                "image_url": None if index % 3 else f"https://cdn.example.com/{index}.jpg",
+                "qr_code": str(uuid4()),
+                "type_name": "normal",
+                "type_id": group_ids[index % 2],
+                "points": index % 3 + 1,
+            }
+            for index in range(rows)
+        ],
+        "next_cursor": "MjAyNi0xMC0xOFQwODo0ODo0Mi43MTg3NTUrMDA6MDB8ZjQ",
+    }
+
+
+def result_payload(rows: int) -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "game_id": str(uuid4()),
+        "group_leaderboard": [
+            {
+                "group_id": uuid4(),
+                "name": f"Group {index}",
+                "code": f"G{index:05d}",
+                "score": 1000 - index,
+                "captures_count": 500 - index // 2,
+                "updated_at": now,
+            }
+            for index in range(20)
+        ],
+        "personal_leaderboard": [
+            {
+                "user_id": uuid4(),
+                "score": rows - index,
+                "captures_count": index % 17,
+                "nickname": f"player{index}",
+                "avatar_url": None,
+                "updated_at": now if index % 5 else None,
+            }
+            for index in range(rows)
+        ],
+    }
+
+
+def eyeballs_payload(rows: int) -> dict:
+    type_ids = [uuid4(), uuid4()]
+    return {
+        "game_id": str(uuid4()),
+        "eyeballs": [
+            {
+                "id": uuid4(),
+                "qr_code": str(uuid4()),
+                "is_active": bool(index % 4),
+                "type_name": "golden" if index % 2 else "normal",
+                "type_id": type_ids[index % 2],
+                "points": index % 3 + 1,
+            }
+            for index in range(rows)
+        ],
+    }
+
+
+def _time_per_call(func, repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(args) -> None:
+    cases = [
+        ("GET /games/{game_id}/captures", GameCapturesResponse, captures_payload(args.rows)),
+        ("GET /games/{game_id}/result", GameResultResponse, result_payload(args.rows)),
+        ("GET /games/{game_id}/eyeballs", GameEyeballsResponse, eyeballs_payload(args.rows)),
+    ]
+    scale = 1000 / args.rows
+    print(f"{'payload':<32} {'before ms/1k':>13} {'after ms/1k':>12} {'speedup':>8}")
+    for label, model, payload in cases:
+        adapter = TypeAdapter(model)
+        before = _time_per_call(lambda: _render_default(jsonable_encoder(payload)), args.repeat)
+        after = _time_per_call(lambda: adapter.dump_json(adapter.validate_python(payload)), args.repeat)
+        # Same document either way, modulo pydantic writing UTC offsets as "Z".
+        assert json.loads(adapter.dump_json(adapter.validate_python(payload))).keys() == payload.keys()
+        print(
+            f"{label:<32} {before * 1000 * scale:>13.2f} {after * 1000 * scale:>12.2f} "
+            f"{before / after:>7.1f}x"
+        )
+
+
+def parse_args(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -29,6 +29,7 @@ CREATE TABLE IF NOT EXISTS public.groups (
     name text NULL,
     owner_id uuid REFERENCES auth.users(id),
     max_members int NOT NULL DEFAULT 6,
+    member_count int NOT NULL DEFAULT 0,
     created_at timestamptz NOT NULL DEFAULT now()
 );
 
@@ -40,6 +41,15 @@ CREATE TABLE IF NOT EXISTS public.group_members (
     PRIMARY KEY (group_id, user_id)
 );
 
+-- member_count is kept by trg_group_members_count_* below; joins check capacity
+-- against it under the group's row lock.
+ALTER TABLE public.groups ADD COLUMN IF NOT EXISTS member_count int NOT NULL DEFAULT 0;
+
+UPDATE public.groups g
+SET member_count = m.members
+FROM (SELECT group_id, COUNT(*) AS members FROM public.group_members GROUP BY group_id) AS m
+WHERE m.group_id = g.id AND g.member_count <> m.members;
+
 CREATE TABLE IF NOT EXISTS public.eyeball_types (
     id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
     name text NOT NULL,
@@ -65,6 +75,7 @@ CREATE TABLE IF NOT EXISTS public.captures (
     user_id uuid NOT NULL REFERENCES auth.users(id),
     eyeball_id uuid NOT NULL REFERENCES public.eyeballs(id),
     captured_at timestamptz NOT NULL DEFAULT now(),
+    image_url text NULL,
     UNIQUE (game_id, eyeball_id)
 );
 
@@ -77,6 +88,66 @@ CREATE TABLE IF NOT EXISTS public.group_scores (
     PRIMARY KEY (group_id, user_id)
 );
 
+-- Per-group totals maintained by the capture statement, so leaderboards
+-- read one row per group instead of aggregating group_scores. Every group gets
+-- its row on insert (trg_groups_create_totals), however the group was created.
+CREATE TABLE IF NOT EXISTS public.group_totals (
+    group_id uuid PRIMARY KEY REFERENCES public.groups(id) ON DELETE CASCADE,
+    game_id uuid NOT NULL REFERENCES public.games(id) ON DELETE CASCADE,
+    total_score int NOT NULL DEFAULT 0,
+    captures_count int NOT NULL DEFAULT 0,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO public.group_totals (group_id, game_id, total_score, captures_count, updated_at)
+SELECT g.id,
+       g.game_id,
+       COALESCE(SUM(gs.score), 0),
+       COALESCE(SUM(gs.captures_count), 0),
+       COALESCE(MAX(gs.updated_at), g.created_at)
+FROM public.groups g
+LEFT JOIN public.group_scores gs ON gs.group_id = g.id
+GROUP BY g.id
+ON CONFLICT (group_id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.create_group_totals() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO public.group_totals (group_id, game_id)
+    SELECT id, game_id FROM new_rows
+    ON CONFLICT (group_id) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_groups_create_totals ON public.groups;
+CREATE TRIGGER trg_groups_create_totals
+    AFTER INSERT ON public.groups
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.create_group_totals();
+
+-- Bumped by every write that changes a game's leaderboards or group views;
+-- read endpoints derive their ETag from it.
+CREATE TABLE IF NOT EXISTS public.game_versions (
+    game_id uuid PRIMARY KEY REFERENCES public.games(id) ON DELETE CASCADE,
+    version bigint NOT NULL DEFAULT 0
+);
+
+-- Active eyeballs per game and type, kept by trg_eyeballs_active_counts below so
+-- the map's counters read one row per type instead of counting eyeballs.
+CREATE TABLE IF NOT EXISTS public.eyeball_active_counts (
+    game_id uuid NOT NULL REFERENCES public.games(id) ON DELETE CASCADE,
+    type_id uuid NOT NULL REFERENCES public.eyeball_types(id) ON DELETE CASCADE,
+    active_count int NOT NULL DEFAULT 0,
+    PRIMARY KEY (game_id, type_id)
+);
+
+INSERT INTO public.eyeball_active_counts (game_id, type_id, active_count)
+SELECT game_id, type_id, COUNT(*)
+FROM public.eyeballs
+WHERE is_active
+GROUP BY game_id, type_id
+ON CONFLICT (game_id, type_id) DO NOTHING;
+
 CREATE TABLE IF NOT EXISTS public.personal_scores (
     game_id uuid NOT NULL REFERENCES public.games(id) ON DELETE CASCADE,
     user_id uuid NOT NULL REFERENCES auth.users(id),
@@ -94,10 +165,225 @@ CREATE TABLE IF NOT EXISTS public.capture_events (
     created_at timestamptz NOT NULL DEFAULT now()
 );
 
+-- Google OAuth PKCE state shared by all workers (OAUTH_STATE_BACKEND=postgres).
+-- Unlogged: a crash only loses logins that are mid-redirect, and inserts skip WAL.
+-- Kept out of public, which the API and /summary expose: a readable verifier
+-- defeats PKCE.
+CREATE SCHEMA IF NOT EXISTS private;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS private.oauth_states (
+    state text PRIMARY KEY,
+    code_verifier text NOT NULL,
+    expires_at timestamptz NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_oauth_states_expires_at ON private.oauth_states (expires_at);
+
 CREATE INDEX IF NOT EXISTS idx_games_expires_at ON public.games (expires_at);
 CREATE INDEX IF NOT EXISTS idx_games_status ON public.games (status);
+CREATE INDEX IF NOT EXISTS idx_games_active_created_at
+    ON public.games (created_at DESC)
+    WHERE status IN ('lobby', 'playing');
 CREATE INDEX IF NOT EXISTS idx_eyeballs_game_id ON public.eyeballs (game_id);
 CREATE INDEX IF NOT EXISTS idx_captures_game_captured_at ON public.captures (game_id, captured_at);
 CREATE INDEX IF NOT EXISTS idx_captures_group_captured_at ON public.captures (group_id, captured_at);
+CREATE INDEX IF NOT EXISTS idx_captures_user_captured_at ON public.captures (user_id, captured_at);
 CREATE INDEX IF NOT EXISTS idx_group_scores_score ON public.group_scores (group_id, score DESC);
+CREATE INDEX IF NOT EXISTS idx_group_totals_game_score
+    ON public.group_totals (game_id, total_score DESC, updated_at ASC);
 CREATE INDEX IF NOT EXISTS idx_personal_scores_score ON public.personal_scores (game_id, score DESC);
+
+-- Realtime fan-out: app/core/events.py LISTENs on game_events in every worker.
+CREATE OR REPLACE FUNCTION public.notify_group_totals() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'game_events',
+        json_build_object(
+            'type', 'leaderboard',
+            'game_id', NEW.game_id,
+            'data', json_build_object(
+                'group_id', NEW.group_id,
+                'name', (SELECT g.name FROM public.groups g WHERE g.id = NEW.group_id),
+                'code', (SELECT g.code FROM public.groups g WHERE g.id = NEW.group_id),
+                'score', NEW.total_score,
+                'captures_count', NEW.captures_count,
+                'updated_at', NEW.updated_at
+            )
+        )::text
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_group_totals_notify ON public.group_totals;
+CREATE TRIGGER trg_group_totals_notify
+    AFTER INSERT OR UPDATE ON public.group_totals
+    FOR EACH ROW EXECUTE FUNCTION public.notify_group_totals();
+
+CREATE OR REPLACE FUNCTION public.notify_games() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify(
+        'game_events',
+        json_build_object('type', 'game', 'game_id', COALESCE(NEW.id, OLD.id))::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_games_notify ON public.games;
+CREATE TRIGGER trg_games_notify
+    AFTER INSERT OR DELETE OR UPDATE OF status, expires_at, created_at ON public.games
+    FOR EACH ROW EXECUTE FUNCTION public.notify_games();
+
+-- QR resolution index (app/core/qr_index.py). Active-flag flips, which is what a
+-- capture does, are sent per row so workers patch their index in place. Inserts,
+-- deletes and edits to anything else send one 'eyeballs' event per game, and
+-- workers reload that game's index.
+CREATE OR REPLACE FUNCTION public.notify_eyeball_update() RETURNS trigger AS $$
+BEGIN
+    IF (OLD.game_id, OLD.qr_code, OLD.type_id, OLD.point)
+       IS NOT DISTINCT FROM (NEW.game_id, NEW.qr_code, NEW.type_id, NEW.point) THEN
+        PERFORM pg_notify(
+            'game_events',
+            json_build_object(
+                'type', 'eyeball',
+                'game_id', NEW.game_id,
+                'data', json_build_object('id', NEW.id, 'is_active', NEW.is_active)
+            )::text
+        );
+    ELSE
+        -- Identical payloads are delivered once per transaction.
+        PERFORM pg_notify('game_events', json_build_object('type', 'eyeballs', 'game_id', OLD.game_id)::text);
+        PERFORM pg_notify('game_events', json_build_object('type', 'eyeballs', 'game_id', NEW.game_id)::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_eyeballs_update_notify ON public.eyeballs;
+CREATE TRIGGER trg_eyeballs_update_notify
+    AFTER UPDATE ON public.eyeballs
+    FOR EACH ROW
+    WHEN ((OLD.game_id, OLD.qr_code, OLD.type_id, OLD.point, OLD.is_active)
+          IS DISTINCT FROM (NEW.game_id, NEW.qr_code, NEW.type_id, NEW.point, NEW.is_active))
+    EXECUTE FUNCTION public.notify_eyeball_update();
+
+CREATE OR REPLACE FUNCTION public.notify_eyeballs_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('game_events', json_build_object('type', 'eyeballs', 'game_id', changed.game_id)::text)
+    FROM (SELECT DISTINCT game_id FROM changed_rows) AS changed;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_eyeballs_insert_notify ON public.eyeballs;
+CREATE TRIGGER trg_eyeballs_insert_notify
+    AFTER INSERT ON public.eyeballs
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_eyeballs_changed();
+
+DROP TRIGGER IF EXISTS trg_eyeballs_delete_notify ON public.eyeballs;
+CREATE TRIGGER trg_eyeballs_delete_notify
+    AFTER DELETE ON public.eyeballs
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_eyeballs_changed();
+
+-- Eyeball type catalog cache (app/core/eyeball_types.py).
+CREATE OR REPLACE FUNCTION public.notify_eyeball_types() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('game_events', json_build_object('type', 'eyeball_types')::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_eyeball_types_notify ON public.eyeball_types;
+CREATE TRIGGER trg_eyeball_types_notify
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.eyeball_types
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notify_eyeball_types();
+
+-- Keeps eyeball_active_counts in step with inserts, captures, reactivation and
+-- deletes inside the writing transaction. Deletes only decrement existing rows:
+-- when a whole game is deleted its counters are already gone with the cascade.
+CREATE OR REPLACE FUNCTION public.maintain_eyeball_active_counts() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.eyeball_active_counts AS c (game_id, type_id, active_count)
+        SELECT game_id, type_id, COUNT(*)
+        FROM new_rows
+        WHERE is_active
+        GROUP BY game_id, type_id
+        ON CONFLICT (game_id, type_id)
+        DO UPDATE SET active_count = c.active_count + EXCLUDED.active_count;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE public.eyeball_active_counts c
+        SET active_count = c.active_count - d.removed
+        FROM (
+            SELECT game_id, type_id, COUNT(*) AS removed
+            FROM old_rows
+            WHERE is_active
+            GROUP BY game_id, type_id
+        ) AS d
+        WHERE c.game_id = d.game_id AND c.type_id = d.type_id;
+    ELSE
+        INSERT INTO public.eyeball_active_counts AS c (game_id, type_id, active_count)
+        SELECT d.game_id, d.type_id, SUM(d.delta)
+        FROM (
+            SELECT game_id, type_id, 1 AS delta FROM new_rows WHERE is_active
+            UNION ALL
+            SELECT game_id, type_id, -1 AS delta FROM old_rows WHERE is_active
+        ) AS d
+        GROUP BY d.game_id, d.type_id
+        HAVING SUM(d.delta) <> 0
+        ON CONFLICT (game_id, type_id)
+        DO UPDATE SET active_count = c.active_count + EXCLUDED.active_count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_eyeballs_active_counts_insert ON public.eyeballs;
+CREATE TRIGGER trg_eyeballs_active_counts_insert
+    AFTER INSERT ON public.eyeballs
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_eyeball_active_counts();
+
+DROP TRIGGER IF EXISTS trg_eyeballs_active_counts_update ON public.eyeballs;
+CREATE TRIGGER trg_eyeballs_active_counts_update
+    AFTER UPDATE ON public.eyeballs
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_eyeball_active_counts();
+
+DROP TRIGGER IF EXISTS trg_eyeballs_active_counts_delete ON public.eyeballs;
+CREATE TRIGGER trg_eyeballs_active_counts_delete
+    AFTER DELETE ON public.eyeballs
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_eyeball_active_counts();
+
+CREATE OR REPLACE FUNCTION public.maintain_group_member_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE public.groups g
+        SET member_count = g.member_count + m.members
+        FROM (SELECT group_id, COUNT(*) AS members FROM new_rows GROUP BY group_id) AS m
+        WHERE g.id = m.group_id;
+    ELSE
+        UPDATE public.groups g
+        SET member_count = g.member_count - m.members
+        FROM (SELECT group_id, COUNT(*) AS members FROM old_rows GROUP BY group_id) AS m
+        WHERE g.id = m.group_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_group_members_count_insert ON public.group_members;
+CREATE TRIGGER trg_group_members_count_insert
+    AFTER INSERT ON public.group_members
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_group_member_count();
+
+DROP TRIGGER IF EXISTS trg_group_members_count_delete ON public.group_members;
+CREATE TRIGGER trg_group_members_count_delete
+    AFTER DELETE ON public.group_members
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.maintain_group_member_count();
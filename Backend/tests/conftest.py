@@ -0,0 +1,155 @@
+import os
+import time
+from uuid import uuid4
+
+import httpx
+from jose import jwt
+import pytest
+
+# Route tests need a Postgres with db/schema.sql applied; point DATABASE_URL
+# (postgresql+asyncpg://...) at it. Without one they are skipped.
+os.environ.setdefault("GOOGLE_CLIENT_ID", "test")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "test")
+os.environ.setdefault("GOOGLE_REDIRECT_URI", "http://test/auth/google/callback")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def _token(user_id) -> str:
+    from app.core.config import get_settings
+
+    return jwt.encode(
+        {"sub": str(user_id), "exp": int(time.time()) + 3600},
+        get_settings().supabase_jwt_secret,
+        algorithm="HS256",
+    )
+
+
+def _reset_caches():
+    from app.core.active_game import invalidate_active_game
+    from app.core.eyeball_types import invalidate_eyeball_types
+    from app.core.qr_index import invalidate_qr_index
+
+    # Tests run without the lifespan LISTEN loop, so nothing else clears them.
+    invalidate_active_game()
+    invalidate_eyeball_types()
+    invalidate_qr_index()
+
+
+@pytest.fixture
+async def client():
+    if not os.environ.get("DATABASE_URL"):
+        pytest.skip("DATABASE_URL is not set")
+
+    from app.core.db import engine, replica_engine
+    from app.main import app
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test",
+        headers={"Authorization": f"Bearer {_token(uuid4())}"},
+    ) as client:
+        yield client
+    # Each test runs on its own event loop; pooled connections cannot follow it.
+    await engine.dispose()
+    await replica_engine.dispose()
+
+
+@pytest.fixture
+def auth_headers():
+    return lambda user_id: {"Authorization": f"Bearer {_token(user_id)}"}
+
+
+@pytest.fixture
+async def seeded(client):
+    # A playing game with one group (owner plus one free seat) and a few eyeballs,
+    # and one eyeball of a finished game. Routes resolve "the" active game, so the
+    # database must not have another lobby/playing game.
+    from sqlalchemy import text
+
+    from app.core.db import engine
+
+    data = {
+        "owner": uuid4(),
+        "player": uuid4(),
+        "game": uuid4(),
+        "other_game": uuid4(),
+        "type": uuid4(),
+        "group": uuid4(),
+        "group_code": uuid4().hex[:6].upper(),
+        "eyeballs": [uuid4() for _ in range(3)],
+        "other_eyeball": uuid4(),
+    }
+    users = [data["owner"], data["player"]]
+    async with engine.begin() as conn:
+        for user_id in users:
+            await conn.execute(
+                text("INSERT INTO auth.users (id, email) VALUES (:id, :email)"),
+                {"id": user_id, "email": f"{user_id}@test.invalid"},
+            )
+            await conn.execute(
+                text("INSERT INTO public.users (id, nickname) VALUES (:id, 'tester')"), {"id": user_id}
+            )
+        await conn.execute(
+            text(
+                "INSERT INTO public.games (id, title, status, expires_at) VALUES "
+                "(:game, 'test', 'playing', now() + interval '1 day'), "
+                "(:other_game, 'old', 'finished', now() + interval '1 day')"
+            ),
+            data,
+        )
+        await conn.execute(
+            text("INSERT INTO public.eyeball_types (id, name) VALUES (:type, 'test')"), data
+        )
+        for index, eyeball_id in enumerate(data["eyeballs"]):
+            await conn.execute(
+                text(
+                    "INSERT INTO public.eyeballs (id, game_id, type_id, qr_code, point) "
+                    "VALUES (:id, :game, :type, :qr_code, 10)"
+                ),
+                {**data, "id": eyeball_id, "qr_code": f"test-{eyeball_id}-{index}"},
+            )
+        await conn.execute(
+            text(
+                "INSERT INTO public.eyeballs (id, game_id, type_id, qr_code, point) "
+                "VALUES (:other_eyeball, :other_game, :type, :qr_code, 5)"
+            ),
+            {**data, "qr_code": f"test-{data['other_eyeball']}"},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO public.groups (id, game_id, code, name, owner_id, max_members) "
+                "VALUES (:group, :game, :group_code, 'test', :owner, 2)"
+            ),
+            data,
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO public.group_members (group_id, user_id, role) "
+                "VALUES (:group, :owner, 'owner')"
+            ),
+            data,
+        )
+        await conn.execute(
+            text("INSERT INTO public.group_scores (group_id, user_id) VALUES (:group, :owner)"),
+            data,
+        )
+    _reset_caches()
+
+    yield data
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("DELETE FROM public.games WHERE id IN (:game, :other_game)"), data
+        )
+        await conn.execute(text("DELETE FROM public.eyeball_types WHERE id = :type"), data)
+        for table in ("public.users", "auth.users"):
+            await conn.execute(
+                text(f"DELETE FROM {table} WHERE id IN (:owner, :player)"), data
+            )
+    _reset_caches()
@@ -0,0 +1,63 @@
+import pytest
+
+from app.core.metrics import enforce_query_budget
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_capture_within_budget(client, seeded, auth_headers):
+    eyeball_id = str(seeded["eyeballs"][0])
+    with enforce_query_budget():
+        response = await client.post(
+            "/captures", json={"eyeball_id": eyeball_id}, headers=auth_headers(seeded["owner"])
+        )
+    assert response.status_code == 200
+    assert response.json()["points"] == 10
+
+    with enforce_query_budget():
+        response = await client.post(
+            "/captures", json={"eyeball_id": eyeball_id}, headers=auth_headers(seeded["owner"])
+        )
+    assert response.status_code == 400
+
+
+# Cold caches: active game, index load and type catalog; an eyeball outside the
+# active game adds the direct lookup.
+@pytest.mark.parametrize("eyeball", ["active", "other"])
+async def test_resolve_qr_cold_cache_within_budget(client, seeded, eyeball):
+    eyeball_id = seeded["eyeballs"][1] if eyeball == "active" else seeded["other_eyeball"]
+    with enforce_query_budget():
+        response = await client.get("/eyeballs/qr/resolve", params={"value": str(eyeball_id)})
+    assert response.status_code == 200
+    assert response.json()["type_name"] == "test"
+
+
+async def test_resolve_qr_unknown_value(client, seeded):
+    with enforce_query_budget():
+        response = await client.get("/eyeballs/qr/resolve", params={"value": "no-such-code"})
+    assert response.status_code == 404
+
+
+async def test_my_state_within_budget(client, seeded, auth_headers):
+    with enforce_query_budget():
+        response = await client.get("/users/me/state", headers=auth_headers(seeded["owner"]))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["game"]["id"] == str(seeded["game"])
+    assert body["group"]["id"] == str(seeded["group"])
+    assert body["active_counts"] == {"test": 3}
+
+
+async def test_group_join_within_budget(client, seeded, auth_headers):
+    with enforce_query_budget():
+        response = await client.post(
+            "/groups/join", json={"code": seeded["group_code"]}, headers=auth_headers(seeded["player"])
+        )
+    assert response.status_code == 200
+    assert response.json()["id"] == str(seeded["group"])
+
+    with enforce_query_budget():
+        response = await client.post(
+            "/groups/join", json={"code": seeded["group_code"]}, headers=auth_headers(seeded["player"])
+        )
+    assert response.json()["message"] == "Already joined"
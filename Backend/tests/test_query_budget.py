@@ -0,0 +1,33 @@
+from uuid import uuid4
+
+import pytest
+
+from app.core.metrics import QueryBudgetExceeded, enforce_query_budget
+
+pytestmark = pytest.mark.anyio
+
+# An unknown game still runs every statement of these routes, just on no rows.
+ROUTE_BUDGETS = [
+    ("/games/{game_id}/leaderboard", 2),
+    ("/games/{game_id}/result", 3),
+]
+
+
+@pytest.mark.parametrize(("path", "budget"), ROUTE_BUDGETS)
+async def test_route_stays_within_its_budget(client, path, budget):
+    with enforce_query_budget(budget):
+        response = await client.get(path.format(game_id=uuid4()))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", [path for path, _ in ROUTE_BUDGETS])
+async def test_route_declared_budget_is_enforced(client, path):
+    with enforce_query_budget():
+        response = await client.get(path.format(game_id=uuid4()))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(("path", "budget"), ROUTE_BUDGETS)
+async def test_route_over_budget_raises(client, path, budget):
+    with enforce_query_budget(budget - 1), pytest.raises(QueryBudgetExceeded):
+        await client.get(path.format(game_id=uuid4()))
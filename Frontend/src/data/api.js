@@ -1,3 +1,5 @@
+import { getReadYourWritesHeader, rememberReadYourWrites } from "../lib/readYourWrites";
+
 const API_BASE_URL =
   process.env.REACT_APP_API_URL || "http://127.0.0.1:8000";
 console.log("API_BASE_URL:", API_BASE_URL);
@@ -23,6 +25,7 @@ async function request(path, options = {}) {
       headers: {
         "Content-Type": "application/json",
         ...getAuthHeader(),
+        ...getReadYourWritesHeader(),
         ...(options.headers || {}),
       },
       ...options,
@@ -31,6 +34,8 @@ async function request(path, options = {}) {
     emitLoading(-1);
   }
 
+  rememberReadYourWrites(res);
+
   if (!res.ok) {
     throw new Error(`API Error ${res.status}`);
   }
@@ -1,4 +1,6 @@
-const API_BASE_URL =
+import { getReadYourWritesHeader, rememberReadYourWrites } from "./readYourWrites";
+
+export const API_BASE_URL =
   process.env.REACT_APP_API_URL || "http://127.0.0.1:8000";
 
 function emitLoading(delta) {
@@ -10,6 +12,7 @@ export async function apiFetch(path, options = {}) {
   const token = localStorage.getItem("access_token");
   const headers = {
     "Content-Type": "application/json",
+    ...getReadYourWritesHeader(),
     ...(options.headers || {}),
   };
 
@@ -28,6 +31,8 @@ export async function apiFetch(path, options = {}) {
     emitLoading(-1);
   }
 
+  rememberReadYourWrites(response);
+
   if (!response.ok) {
     let detail = null;
     try {
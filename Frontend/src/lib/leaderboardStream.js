@@ -0,0 +1,74 @@
+import { API_BASE_URL } from "./apiClient";
+
+// Live group leaderboard from GET /games/{gameId}/leaderboard/stream (Server-Sent Events).
+// EventSource cannot send the Authorization header the API requires, so this reads the
+// stream with fetch instead. The server sends a "snapshot" event with the full group
+// leaderboard, then "delta" events holding only the groups that changed. A dropped
+// stream reconnects after a short delay and starts over with a fresh snapshot.
+//
+//   const unsubscribe = subscribeLeaderboard(gameId, { onSnapshot, onDelta, onError });
+//   ...
+//   unsubscribe();
+const RECONNECT_DELAY_MS = 3000;
+
+function parseEvent(raw) {
+  let event = "message";
+  const data = [];
+  raw.split("\n").forEach((line) => {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+  });
+  return data.length ? { event, data: JSON.parse(data.join("\n")) } : null;
+}
+
+async function readStream(gameId, signal, handlers) {
+  const token = localStorage.getItem("access_token");
+  const response = await fetch(`${API_BASE_URL}/games/${gameId}/leaderboard/stream`, {
+    headers: {
+      Accept: "text/event-stream",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    signal,
+  });
+  if (!response.ok || !response.body) {
+    const err = new Error(`Leaderboard stream failed: ${response.status}`);
+    err.status = response.status;
+    throw err;
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      const parsed = parseEvent(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      if (parsed?.event === "snapshot") handlers.onSnapshot?.(parsed.data);
+      if (parsed?.event === "delta") handlers.onDelta?.(parsed.data);
+      boundary = buffer.indexOf("\n\n");
+    }
+  }
+}
+
+export function subscribeLeaderboard(gameId, handlers = {}) {
+  const controller = new AbortController();
+
+  const run = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        await readStream(gameId, controller.signal, handlers);
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        handlers.onError?.(error);
+        if (error?.status === 401 || error?.status === 403) return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, RECONNECT_DELAY_MS));
+    }
+  };
+
+  run();
+  return () => controller.abort();
+}
@@ -0,0 +1,15 @@
+// After a write the API returns a short-lived read-your-writes deadline; echoing it
+// keeps our next reads on the primary DB whichever server instance handles them.
+// Shared by every API client so a write through one is seen by reads through another.
+const READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes";
+let readYourWritesUntil = null;
+
+export function getReadYourWritesHeader() {
+  if (!readYourWritesUntil || Number(readYourWritesUntil) * 1000 < Date.now()) return {};
+  return { [READ_YOUR_WRITES_HEADER]: readYourWritesUntil };
+}
+
+export function rememberReadYourWrites(response) {
+  const pinnedUntil = response.headers.get(READ_YOUR_WRITES_HEADER);
+  if (pinnedUntil) readYourWritesUntil = pinnedUntil;
+}
@@ -1,13 +1,53 @@
-import { useEffect, useState } from "react";
+import { useEffect, useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import RankingLayout from "./Ranking_layout";
 import TopRankPodium from "../../ui/ranking/TopRankPodium";
 import RankCard from "../../ui/ranking/RankCard";
 import { apiFetch } from "../../lib/apiClient";
+import { subscribeLeaderboard } from "../../lib/leaderboardStream";
+
+const enrichWithGaps = (items) => {
+  if (!items.length) return [];
+  return items.map((item, index) => {
+    if (index === 0) {
+      return { ...item, gapText: null };
+    }
+    const prevScore = items[index - 1]?.score ?? item.score;
+    const neededScore = Math.max(prevScore - item.score, 0) + 1;
+    const gapText = `${neededScore}점 더 얻으면 순위 상승 가능`;
+    return { ...item, gapText };
+  });
+};
+
+const toGroupRows = (entries) =>
+  enrichWithGaps(
+    entries.map((entry, index) => ({
+      id: entry.group_id,
+      rank: index + 1,
+      name: entry.name || "group",
+      eye: entry.captures_count ?? 0,
+      score: entry.score ?? 0,
+    }))
+  );
+
+// Same order as the server: score desc, then whoever reached it first.
+const mergeGroupDeltas = (entries, deltas) => {
+  const byId = new Map(entries.map((entry) => [String(entry.group_id), entry]));
+  deltas.forEach((delta) => {
+    const key = String(delta.group_id);
+    byId.set(key, { ...byId.get(key), ...delta });
+  });
+  return [...byId.values()].sort(
+    (a, b) =>
+      (b.score ?? 0) - (a.score ?? 0) ||
+      (Date.parse(a.updated_at) || 0) - (Date.parse(b.updated_at) || 0)
+  );
+};
 
 export default function RankingGroup() {
   const navigate = useNavigate();
-  const [groupRows, setGroupRows] = useState([]);
+  const [gameId, setGameId] = useState(null);
+  const [groupEntries, setGroupEntries] = useState([]);
   const [personalRows, setPersonalRows] = useState([]);
   const [myGroupId, setMyGroupId] = useState(null);
   const [me, setMe] = useState(null);
@@ -29,7 +69,8 @@ export default function RankingGroup() {
         const game = activeGame?.game;
         if (!game) {
           if (active) {
-            setGroupRows([]);
+            setGameId(null);
+            setGroupEntries([]);
             setPersonalRows([]);
             setMyGroupId(null);
             setMe(meRes || null);
@@ -43,14 +84,7 @@ export default function RankingGroup() {
           apiFetch(`/games/${game.id}/result`),
         ]);
 
-        const groupItems = (leaderboard?.leaderboard || []).map((entry, index) => ({
-          id: entry.group_id,
-          rank: index + 1,
-          name: entry.name || "group",
-          eye: entry.captures_count ?? 0,
-          score: entry.score ?? 0,
-        }));
-
+        const leaderboardEntries = leaderboard?.leaderboard || [];
         const personal = result?.personal_leaderboard || [];
         const personalItems = personal
           .reduce((acc, entry) => {
@@ -68,29 +102,16 @@ export default function RankingGroup() {
             score: entry.score ?? 0,
           }));
 
-        const enrichWithGaps = (items) => {
-          if (!items.length) return [];
-          return items.map((item, index) => {
-            if (index === 0) {
-              return { ...item, gapText: null };
-            }
-            const prevScore = items[index - 1]?.score ?? item.score;
-            const neededScore = Math.max(prevScore - item.score, 0) + 1;
-            const gapText = `${neededScore}점 더 얻으면 순위 상승 가능`;
-            return { ...item, gapText };
-          });
-        };
-
-        const groupItemsWithGaps = enrichWithGaps(groupItems);
         const personalItemsWithGaps = enrichWithGaps(personalItems);
 
         if (active) {
-          setGroupRows(groupItemsWithGaps);
+          setGameId(game.id);
+          setGroupEntries(leaderboardEntries);
           setPersonalRows(personalItemsWithGaps);
           setMyGroupId(myGroup?.id ?? null);
           setMe(meRes || null);
           setStatus(
-            groupItemsWithGaps.length || personalItemsWithGaps.length ? "ready" : "empty"
+            leaderboardEntries.length || personalItemsWithGaps.length ? "ready" : "empty"
           );
         }
       } catch (error) {
@@ -110,6 +131,16 @@ export default function RankingGroup() {
     };
   }, [navigate]);
 
+  useEffect(() => {
+    if (!gameId) return undefined;
+    return subscribeLeaderboard(gameId, {
+      onSnapshot: (data) => setGroupEntries(data?.leaderboard || []),
+      onDelta: (data) =>
+        setGroupEntries((entries) => mergeGroupDeltas(entries, data?.groups || [])),
+    });
+  }, [gameId]);
+
+  const groupRows = useMemo(() => toGroupRows(groupEntries), [groupEntries]);
   const myId = me?.id;
   const myIdKey = myId ? String(myId) : null;
   const groupTopCount = Math.min(groupRows.length, 3);